@@ -0,0 +1,119 @@
+# Startup assets for awacs_sim: vectorized tone synthesis, a disk cache for generated tones and
+# background surfaces keyed by size and seed, and a sound bank that opens the mixer after the first frame
+
+import os
+import numpy as np
+import pygame
+
+CACHE_DIR = os.environ.get("AWACS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "awacs_sim"))
+ASSET_VERSION = 1  # Part of every cache file name; bump when a generator changes
+SAMPLE_RATE = 44100
+
+
+def tone(frequency, samples, sample_rate=SAMPLE_RATE):
+    # Unsigned 8-bit sine samples, the block written twice over, as the mixer buffers have always been laid out
+    wave = (128 + 127 * np.sin(2 * np.pi * frequency * np.arange(samples) / sample_rate)).astype(np.uint8)
+    return np.tile(wave, 2).tobytes()
+
+
+# Generated assets in memory and under `root`. Keys are tuples of names and numbers; anything built
+# from a seed must include it. Disk failures only cost a rebuild.
+class AssetCache:
+    def __init__(self, root=CACHE_DIR):
+        self.root = root
+        self.memory = {}
+        self.hits = 0  # Memory
+        self.loads = 0  # Disk
+        self.builds = 0
+
+    def _path(self, key):
+        return os.path.join(self.root, "-".join(str(part) for part in key) + f".v{ASSET_VERSION}.bin")
+
+    def _read(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        self.loads += 1
+        return data
+
+    def _write(self, key, data):
+        path = self._path(key)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)  # Readers never see a partial file
+        except OSError:
+            pass
+
+    def bytes(self, key, build):
+        data = self.memory.get(key)
+        if data is not None:
+            self.hits += 1
+            return data
+        data = self._read(key)
+        if data is None:
+            data = build()
+            self.builds += 1
+            self._write(key, data)
+        self.memory[key] = data
+        return data
+
+    def surface(self, key, build, alpha=True):
+        # build() returns a Surface; the cached copy comes back converted for fast blits
+        surface = self.memory.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        fmt = "RGBA" if alpha else "RGB"
+        data = self._read(key)
+        if data is not None:
+            size = tuple(int(n) for n in data[:16].split(b"x"))
+            surface = pygame.image.frombytes(data[16:], size, fmt)
+        else:
+            surface = build()
+            self.builds += 1
+            self._write(key, f"{surface.get_width()}x{surface.get_height()}".encode().ljust(16) + pygame.image.tobytes(surface, fmt))
+        surface = surface.convert_alpha() if alpha else surface.convert()
+        self.memory[key] = surface
+        return surface
+
+    def stats(self):
+        return {"hits": self.hits, "loads": self.loads, "builds": self.builds}
+
+
+# Named tones, each (frequency, samples). open() starts the mixer on the calling thread, meant to be the
+# main one once the first frame is up, and makes the buffers from cached tone bytes; plays before that
+# are queued and played once it is open.
+class SoundBank:
+    def __init__(self, tones, cache):
+        self.tones = tones
+        self.cache = cache
+        self.sounds = None
+        self.queued = []
+
+    def open(self):
+        if self.sounds is not None:
+            return
+        try:
+            pygame.mixer.init()
+            self.sounds = {name: pygame.mixer.Sound(buffer=self.cache.bytes(("tone", frequency, samples, SAMPLE_RATE),
+                                                                           lambda f=frequency, n=samples: tone(f, n)))
+                           for name, (frequency, samples) in self.tones.items()}
+        except Exception as e:
+            print(f"Audio initialization failed: {e}")
+            self.sounds = {}
+        for name in self.queued:
+            self.play(name)
+        self.queued = []
+
+    def play(self, name):
+        if self.sounds is None:
+            if name not in self.queued:
+                self.queued.append(name)
+            return
+        sound = self.sounds.get(name)
+        if sound is not None:
+            sound.play()
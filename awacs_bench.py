@@ -0,0 +1,58 @@
+# Headless render benchmark: runs awacs_sim1 under the dummy video driver with a fixed seed for each
+# target count and feature toggle, and prints one JSON result per run
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+COUNTS = [27, 500, 5000, 20000]
+FEATURES = ["", "jamming", "weather", "elint", "track", "intercept"]
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "awacs_sim1.py")
+
+
+def population(count):
+    # Scale the stock 20 aircraft / 5 missiles / 2 interceptors mix to `count` tracks
+    missiles = max(1, round(count * 5 / 27))
+    interceptors = max(1, round(count * 2 / 27))
+    return count - missiles - interceptors, missiles, interceptors
+
+
+def run(count, features, frames, seed, dirty_rects=False, cold=False, timeout=1800):
+    with tempfile.TemporaryDirectory() as tmp:
+        perf_out = os.path.join(tmp, "perf.json")
+        env = dict(os.environ, SDL_VIDEODRIVER="dummy", SDL_AUDIODRIVER="dummy", AWACS_SEED=str(seed),
+                   AWACS_POPULATION=",".join(map(str, population(count))), AWACS_FEATURES=features,
+                   AWACS_FRAMES=str(frames), AWACS_FPS_CAP="0", AWACS_LOCKSTEP="1", AWACS_PERF_OUT=perf_out,
+                   AWACS_DIRTY_RECTS="1" if dirty_rects else "0")
+        if cold:
+            env["AWACS_CACHE_DIR"] = os.path.join(tmp, "assets")  # Empty asset cache: startup generates everything
+        subprocess.run([sys.executable, SCRIPT], env=env, check=True, timeout=timeout,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(perf_out) as f:
+            result = json.load(f)
+    return {"count": count, "features": features or "none", "seed": seed, "dirty_rects": dirty_rects, "cold": cold, **result}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless awacs_sim render benchmark")
+    parser.add_argument("--counts", type=lambda s: [int(n) for n in s.split(",")], default=COUNTS)
+    parser.add_argument("--features", type=lambda s: s.split(";"), default=FEATURES,
+                        help="semicolon-separated toggle sets, each a comma list (e.g. 'jamming;weather,elint')")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--dirty-rects", action="store_true")
+    parser.add_argument("--cold", action="store_true", help="start each run with an empty asset cache")
+    parser.add_argument("--output", help="also write all results to this JSON file")
+    args = parser.parse_args()
+    results = []
+    for count in args.counts:
+        for features in args.features:
+            result = run(count, features, args.frames, args.seed, args.dirty_rects, args.cold)
+            results.append(result)
+            print(json.dumps(result), flush=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,112 @@
+# Headless self-check for awacs_sim: a recorded scenario replays to the live state after seeking
+# backward and forward, and the incremental air picture matches a recount from the track table after
+# spawns, retags and retirements. Prints one line per check and exits non-zero if any fails.
+
+import argparse
+import os
+import sys
+import tempfile
+import numpy as np
+from awacs_engine import SimEngine
+from awacs_picture import CODES
+from awacs_record import Recorder, Replay
+from awacs_scenario import Scenario
+
+# Short enough to run in seconds: raids that arrive, hold briefly and retire, a civilian flow that
+# crosses the scope, interceptors on the scope and automatic assignment so some tracks are shot down
+SCENARIO = {
+    "seed": 11,
+    "raids": [{"at_s": 0, "count": 30, "interval_s": 0.2, "bearing": 40, "spread": 10, "range": 0, "threat": "HIGH", "speed": [15, 25], "dwell_s": 5},
+              {"at_s": 2, "count": 10, "interval_s": 0.5, "bearing": 200, "spread": 5, "type": "MISSILE"}],
+    "flows": [{"per_minute": 600, "bearing": 120, "spread": 60, "speed": [10, 15]}],
+    "bases": [{"at_s": 0, "bearing": 40, "distance": 250, "interceptors": 6}],
+}
+
+
+def recount(engine):
+    # Air picture failures against a brute-force recount of the live rows
+    tracks, picture = engine.tracks, engine.picture
+    n = tracks.count
+    detected = engine.ticks - picture._sweep_ticks(np.arange(n)) < picture.slots
+    failures = []
+    if not np.array_equal(picture.detected[:n], detected):
+        failures.append(f"{int(np.count_nonzero(picture.detected[:n] != detected))} rows with the wrong detected flag")
+    for name, size in CODES.items():
+        codes = getattr(tracks, name)[:n]
+        if not np.array_equal(picture.counts[name], np.bincount(codes, minlength=size)):
+            failures.append(f"{name} counts")
+        if not np.array_equal(picture.detected_counts[name], np.bincount(codes[detected], minlength=size)):
+            failures.append(f"{name} detected counts")
+    return failures
+
+
+def check_replay(seconds, every):
+    # Record a scenario run, keeping live snapshots, then seek the replay back through them and forward again
+    engine = SimEngine(seed=SCENARIO["seed"], aircraft=0, missiles=0, interceptors=0)
+    engine.intercept.enabled = True
+    scenario = Scenario(SCENARIO).attach(engine)
+    live = {}
+
+    def keep(engine):
+        if engine.ticks % every == 0:
+            live[engine.ticks] = (engine.tracks.snapshot(), [view.model for view in engine.targets])
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "check.rec")
+        recorder = Recorder(path).attach(engine)
+        engine.tick_hooks.append(keep)
+        engine.run(int(seconds * 60))
+        recorder.close()
+        if not scenario.left or not scenario.downed:
+            failures.append(f"the run retired {scenario.left} tracks that left and {scenario.downed} shot down; both should be > 0")
+        replay = Replay(path, SimEngine(aircraft=0, missiles=0, interceptors=0))
+        for tick in sorted(live, reverse=True) + sorted(live):
+            replay.seek(tick)
+            state, models = live[tick]
+            got = replay.engine.tracks.snapshot()
+            differ = [name for name in state if not np.array_equal(state[name], got[name])]
+            if differ or models != [view.model for view in replay.engine.targets]:
+                failures.append(f"tick {tick}: {', '.join(differ) or 'models'} differ from the live run")
+            failures += [f"tick {tick}: {failure}" for failure in recount(replay.engine)]
+        replay.close()
+    return failures, f"{len(live)} ticks seeked both ways, {engine.retired} tracks retired"
+
+
+def check_picture(ticks, seed):
+    # Step a random population and mutate it through the engine, recounting after every change
+    engine = SimEngine(seed=seed, aircraft=300, missiles=40, interceptors=20)
+    rng = np.random.default_rng(seed)
+    failures = []
+    for step in range(ticks):
+        engine.tick()
+        n = engine.tracks.count
+        action = step % 4
+        if action == 0:
+            engine.spawn_batch(5, angle=rng.uniform(0, 360, 5), distance=rng.uniform(150, 500, 5),
+                               type_code=rng.integers(CODES["type_code"], size=5), last_sweep=engine.now)
+            engine.spawn(is_missile=bool(step % 8))
+        elif action == 1:
+            rows = rng.choice(n, 10, replace=False)
+            name = list(CODES)[step % len(CODES)]
+            engine.picture.retag(rows, name, rng.integers(CODES[name], size=10))
+        elif action == 2:
+            engine.retire(rng.choice(n, 4, replace=False))
+        failures += [f"tick {engine.ticks}: {failure}" for failure in recount(engine)]
+    return failures, f"{ticks} ticks, {engine.tracks.count} tracks left, {engine.retired} retired"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless self-check of replay seeking and the incremental air picture")
+    parser.add_argument("--seconds", type=float, default=30, help="simulated time recorded for the replay check")
+    parser.add_argument("--every", type=int, default=97, help="ticks between live snapshots compared against the replay")
+    parser.add_argument("--ticks", type=int, default=400, help="ticks of the picture check")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+    failed = False
+    for name, (failures, summary) in [("replay", check_replay(args.seconds, args.every)), ("picture", check_picture(args.ticks, args.seed))]:
+        print(f"{name}: {'FAIL' if failures else 'ok'} ({summary})")
+        for failure in failures[:20]:
+            print(f"  {failure}")
+        failed |= bool(failures)
+    sys.exit(1 if failed else 0)
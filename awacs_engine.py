@@ -0,0 +1,257 @@
+# Headless simulation core for awacs_sim (no pygame dependency)
+
+import argparse
+import json
+import random
+import time
+import numpy as np
+from awacs_index import BearingIndex, GridIndex
+from awacs_intercept import InterceptScheduler, intercept_cost, pinned
+from awacs_picture import TrackPicture
+from awacs_tracks import TrackTable, TrackView, TYPES, IFF_STATES, THREAT_LEVELS, INTERCEPTOR, MOVE_SCALE, HISTORY_DEPTH
+
+TICK_RATE = 60
+TICK = 1 / TICK_RATE
+SWEEP_BEAM = 35  # Degrees either side of the sweep line that count as a detection
+DETECT_WINDOW = 6000  # ms a contact stays on the scope after it was last swept
+MAX_CATCH_UP = 0.25  # s of backlog step() simulates before dropping time
+
+
+# Track with classification; UI subclasses add drawing
+class Track(TrackView):
+    AIRCRAFT_TYPES = {
+        "FRIEND": ["F-16", "F-22", "C-130"],
+        "HOSTILE": ["MiG-29", "Su-35", "Tu-95"],
+        "UNKNOWN": ["Unknown"],
+        "CIVILIAN": ["Boeing 737", "Airbus A320"],
+        "MISSILE": ["SAM", "Cruise"],
+        "INTERCEPTOR": ["AIM-120"]
+    }
+
+    def __init__(self, table, rng, radius, is_missile=False, is_interceptor=False):
+        target_type = "INTERCEPTOR" if is_interceptor else "MISSILE" if is_missile else rng.choice(["FRIEND", "HOSTILE", "UNKNOWN", "CIVILIAN"])
+        super().__init__(
+            table,
+            angle=rng.uniform(0, 360),
+            distance=rng.randint(150, radius) if not is_interceptor else radius,
+            speed=rng.uniform(8, 20) if is_missile else rng.uniform(20, 30) if is_interceptor else rng.uniform(1, 5),
+            altitude=rng.randint(500, 6000) if is_missile or is_interceptor else rng.randint(10000, 45000),
+            heading=rng.uniform(0, 360),
+            type_code=TYPES.index(target_type),
+            iff_code=IFF_STATES.index("PENDING" if target_type == "UNKNOWN" else target_type),
+            radar_cross_section=0.05 if is_interceptor else rng.uniform(0.5, 5.0) if not is_missile else 0.1,
+            elint_signature=0 if is_interceptor else rng.randint(100, 500) if not is_missile else 50,
+            threat_code=THREAT_LEVELS.index("LOW" if target_type in ["FRIEND", "CIVILIAN"] else rng.choice(["MED", "HIGH"]) if not is_missile else "CRITICAL" if not is_interceptor else "DEFENSE"),
+        )
+        self.model = rng.choice(self.AIRCRAFT_TYPES[self.type]) if self.type != "UNKNOWN" else "Unknown"
+
+
+class SimEngine:
+    def __init__(self, radius=594, seed=None, track_class=Track, aircraft=20, missiles=5, interceptors=2, history_depth=HISTORY_DEPTH):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.tracks = TrackTable(rng=np.random.default_rng(seed), history_depth=history_depth)
+        self.picture = TrackPicture(self.tracks, DETECT_WINDOW, TICK_RATE)
+        self.targets = self.tracks.views
+        self.track_class = track_class
+        self.radius = radius
+        self.sweep_angle = 0
+        self.sweep_speed = 1.2
+        self.radar_mode = "SEARCH"
+        self.selected = None
+        self.ticks = 0
+        self.now = 0.0  # Simulation time in ms
+        self.intercepts = 0
+        self.retired = 0  # Tracks removed by retire()
+        self.bearings = BearingIndex()
+        self.grid = GridIndex()
+        self.intercept = InterceptScheduler()  # Automatic assignment, off until enabled
+        self._grid_state = None
+        self._backlog = 0.0
+        self.tick_hooks = []  # Called with the engine after every tick, e.g. Recorder.capture
+        self.retire_hooks = []  # Called with the renumber map after every retire(), e.g. Recorder.renumbered
+        self.populate(aircraft, missiles, interceptors)
+
+    def populate(self, aircraft=0, missiles=0, interceptors=0):
+        kinds = [{}] * aircraft + [{"is_missile": True}] * missiles + [{"is_interceptor": True}] * interceptors
+        views = [self.track_class(self.tracks, self.rng, self.radius, **kind) for kind in kinds]
+        self.picture.add(np.array([view.row for view in views], np.intp), self.ticks)
+        return views
+
+    def spawn(self, **kind):
+        view = self.track_class(self.tracks, self.rng, self.radius, **kind)
+        self.picture.add(np.array([view.row]), self.ticks)
+        return view
+
+    def spawn_batch(self, count, **values):
+        # `count` tracks with the given column values (see TrackTable.extend) and no random setup, e.g.
+        # the new ids of a feed batch
+        views = self.track_class.batch(self.tracks, count, **values)
+        self.picture.add(np.array([view.row for view in views], np.intp), self.ticks)
+        return views
+
+    def resize(self, radius):
+        self.radius = radius
+
+    # Fixed-timestep stepping: step() consumes elapsed time in whole ticks, run() goes as fast as possible
+    def step(self, dt=TICK):
+        self._backlog = min(self._backlog + dt, MAX_CATCH_UP)
+        ticks = 0
+        while self._backlog >= TICK:
+            self._backlog -= TICK
+            self.tick()
+            ticks += 1
+        return ticks
+
+    def run(self, ticks):
+        for _ in range(ticks):
+            self.tick()
+        return self
+
+    def tick(self):
+        self.sweep_angle = (self.sweep_angle + self.sweep_speed) % 360
+        self.ticks += 1
+        self.now = self.ticks * 1000 / TICK_RATE
+        self.tracks.step(self.radius)
+        self.intercepts += len(self.tracks.hits)
+        if self.intercept.due(self.ticks):
+            self.intercept.solve(self.tracks, self.detected())
+        n = self.tracks.count
+        self.bearings.update(self.tracks.angle[:n], float(self.tracks.speed[:n].max(initial=0)) * MOVE_SCALE)
+        self.picture.expire(self.ticks)
+        self._detect()
+        for hook in self.tick_hooks:
+            hook(self)
+
+    def _detect(self):
+        # Only tracks in the bearing buckets under the beam are tested
+        if self.radar_mode == "TRACK":
+            rows = np.array([self.selected.row] if self.selected is not None else [], np.intp)
+        else:
+            rows = self.bearings.rows_within(self.sweep_angle, SWEEP_BEAM)
+        delta = np.abs(self.tracks.angle[rows] - self.sweep_angle)
+        swept = rows[np.minimum(delta, 360 - delta) < SWEEP_BEAM]
+        self.tracks.last_sweep[swept] = self.now
+        self.picture.detect(swept, self.ticks)
+
+    # Proximity queries in scope coordinates (y up, unzoomed); the grid is rebuilt lazily once per tick
+    def within(self, x, y, radius):
+        state = (self.ticks, self.tracks.count)
+        if state != self._grid_state:
+            self.grid.update(self.tracks.x[:state[1]], self.tracks.y[:state[1]])
+            self._grid_state = state
+        return self.grid.query(x, y, radius, self.tracks.x, self.tracks.y)
+
+    def reindex(self):
+        # Call after the track table was rewritten wholesale, e.g. by a replay seek
+        self.bearings.invalidate()
+        self._grid_state = None
+        self.picture.rebuild(self.ticks)
+
+    def retire(self, rows):
+        # Remove tracks for good, e.g. ones a scenario saw leave or get shot down. Rows are renumbered
+        # (see TrackTable.compact); returns the new row of every old row, -1 for the removed ones.
+        keep = np.ones(self.tracks.count, bool)
+        keep[rows] = False
+        if self.selected is not None and not keep[self.selected.row]:
+            self.selected = None
+        renumber = self.tracks.compact(keep)
+        self.retired += len(keep) - self.tracks.count
+        self.reindex()
+        for hook in self.retire_hooks:
+            hook(renumber)
+        return renumber
+
+    def relocated(self, jump):
+        # Call after tracks were moved outside tick() by up to `jump` degrees of bearing, e.g. by a feed
+        n = self.tracks.count
+        self.bearings.update(self.tracks.angle[:n], jump)
+        self._grid_state = None
+
+    def pick(self, x, y, radius):
+        rows = self.within(x, y, radius)
+        return self.targets[rows[0]] if len(rows) else None
+
+    # Detection reads come from the incrementally maintained picture
+    def detected(self):
+        return self.picture.detected[:self.tracks.count]
+
+    def hostile_count(self):
+        return self.picture.hostile
+
+    def airspace_status(self):
+        hostile_count = self.hostile_count()
+        return "RED" if hostile_count > 3 else "YELLOW" if hostile_count > 0 else "GREEN"
+
+    # Operator actions
+    def identify(self, track):
+        old_status = track.iff_status
+        if old_status == "PENDING":
+            self.picture.retag(track.row, "iff_code", IFF_STATES.index(self.rng.choice(["FRIEND", "HOSTILE"])))
+        return old_status
+
+    def set_jamming(self, active):
+        self.tracks.scatter("jammed", 0.6, active)
+
+    def set_flares(self, active):
+        self.tracks.scatter("flared", 0.3, active)
+
+    def launch_interceptor(self, target):
+        # Operator launch: the quickest interceptor not already flying a manual intercept, idle or taken off
+        # its automatic assignment, is pinned to the target (see InterceptScheduler)
+        if target.threat_level not in ["HIGH", "CRITICAL"]:
+            return None
+        n = self.tracks.count
+        free = np.nonzero((self.tracks.type_code[:n] == INTERCEPTOR) & ~pinned(self.tracks))[0]
+        if not len(free):
+            return None
+        interceptor = self.targets[free[np.argmin(intercept_cost(self.tracks, free, np.array([target.row]))[:, 0])]]  # Quickest to intercept
+        interceptor.target = target
+        interceptor.manual = True
+        return interceptor
+
+    def release_interceptor(self, interceptor):
+        # Hand a manual intercept back to the scheduler, which may keep or change its target
+        if not interceptor.manual:
+            return False
+        interceptor.manual = False
+        return True
+
+    def summary(self):
+        return {
+            "seed": self.seed,
+            "ticks": self.ticks,
+            "time_s": self.now / 1000,
+            "tracks": self.tracks.count,
+            "detected": self.picture.detected_count,
+            "hostile": self.hostile_count(),
+            "intercepts": self.intercepts,
+            "airspace": self.airspace_status(),
+            "assignment": self.intercept.stats(),
+        }
+
+
+def run_batch(seeds, ticks, auto_intercept=False, **options):
+    results = []
+    for seed in seeds:
+        engine = SimEngine(seed=seed, **options)
+        engine.intercept.enabled = auto_intercept
+        start = time.perf_counter()
+        engine.run(ticks)
+        results.append({**engine.summary(), "tick_ms": (time.perf_counter() - start) * 1000 / max(ticks, 1)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run headless AWACS scenarios and print one JSON summary per run")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first run; later runs count up from it")
+    parser.add_argument("--ticks", type=int, default=TICK_RATE * 60)
+    parser.add_argument("--aircraft", type=int, default=20)
+    parser.add_argument("--missiles", type=int, default=5)
+    parser.add_argument("--interceptors", type=int, default=2)
+    parser.add_argument("--auto-intercept", action="store_true", help="run the interceptor assignment scheduler")
+    args = parser.parse_args()
+    for result in run_batch(range(args.seed, args.seed + args.runs), args.ticks, auto_intercept=args.auto_intercept,
+                            aircraft=args.aircraft, missiles=args.missiles, interceptors=args.interceptors):
+        print(json.dumps(result))
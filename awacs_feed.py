@@ -0,0 +1,290 @@
+# External track feed for awacs_sim: an asyncio service on a background thread receives track reports
+# over UDP or a Unix datagram socket while the render loop runs, and each frame applies them in one batch.
+#
+# A datagram is a packed array of REPORT records, decoded in bulk with np.frombuffer. Reports queue up
+# as whole datagrams; when more than `max_pending` reports are waiting the oldest datagrams are dropped,
+# and at drain time only the newest report per track is kept, so an overloaded feed thins out to the
+# latest picture instead of stalling the frame.
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+import numpy as np
+from awacs_engine import SimEngine, TICK
+from awacs_perf import rolling_stats
+from awacs_tracks import TYPES, IFF_STATES, THREAT_LEVELS
+
+REPORT = np.dtype([
+    ("track_id", "<u4"),
+    ("time", "<f8"),  # Sender wall clock (time.time()) when the report was made
+    ("x", "<f4"), ("y", "<f4"),  # Scope frame, y up
+    ("altitude", "<i4"),
+    ("heading", "<f4"),
+    ("speed", "<f4"),  # Engine units: scope units per tick / MOVE_SCALE
+    ("type_code", "u1"), ("iff_code", "u1"), ("threat_code", "u1"),
+    ("flags", "u1"),
+])
+JAMMED, FLARED = 1, 2  # Bits of REPORT.flags
+REPORTS_PER_DATAGRAM = 1024
+MAX_PENDING = 1 << 17  # Reports queued between frames before the oldest datagrams are dropped
+RECEIVE_BUFFER = 1 << 23
+CODE_LIMITS = {"type_code": len(TYPES), "iff_code": len(IFF_STATES), "threat_code": len(THREAT_LEVELS)}
+
+
+def parse_address(address):
+    # udp://host:port or unix:///path/to/socket
+    if address.startswith("unix://"):
+        return socket.AF_UNIX, address[len("unix://"):]
+    if address.startswith("udp://"):
+        host, _, port = address[len("udp://"):].rpartition(":")
+        return socket.AF_INET, (host or "0.0.0.0", int(port))
+    raise ValueError(f"unsupported feed address {address!r} (use udp://host:port or unix:///path)")
+
+
+def encode_reports(tracks, rows, track_ids=None):
+    # Reports for the given rows of a TrackTable, stamped now; track ids default to the row numbers
+    reports = np.zeros(len(rows), REPORT)
+    reports["track_id"] = rows if track_ids is None else track_ids
+    reports["time"] = time.time()
+    for name in ("x", "y", "altitude", "heading", "speed", "type_code", "iff_code", "threat_code"):
+        reports[name] = getattr(tracks, name)[rows]
+    reports["flags"] = tracks.jammed[rows] * JAMMED | tracks.flared[rows] * FLARED
+    return reports
+
+
+class _FeedProtocol(asyncio.DatagramProtocol):
+    def __init__(self, feed):
+        self.feed = feed
+
+    def datagram_received(self, data, addr):
+        self.feed._receive(data)
+
+
+# on_spawn(view) is called, once the batch is written, for each track view created for a new feed track
+# id and for each track whose type or IFF the batch changed.
+class FeedService:
+    def __init__(self, address, on_spawn=None, max_pending=MAX_PENDING, window=300):
+        self.family, self.address = parse_address(address)
+        self.on_spawn = on_spawn
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.chunks = deque()  # (receive time, reports) per datagram, oldest first
+        self.pending = 0
+        self.ids = np.empty(0, np.uint32)  # Known feed track ids, sorted, and the table row of each
+        self.rows = np.empty(0, np.intp)
+        self.engine = None
+        self.received = self.applied = self.coalesced = self.dropped = 0
+        self.truncated = 0  # Datagrams with a partial trailing report
+        self.rejected = 0  # Reports with out-of-range codes
+        self.depths = deque(maxlen=window)  # Reports waiting at each drain
+        self.latencies = deque(maxlen=window)  # Worst receive-to-apply wait per drain, ms
+        self.ages = deque(maxlen=window)  # Worst report-to-apply age per drain (sender clock), ms
+        self.loop = None
+        self.transport = None
+        self.thread = None
+
+    def start(self):
+        ready = threading.Event()
+        failure = []
+        self.loop = asyncio.new_event_loop()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            try:
+                self.loop.run_until_complete(self._open())
+            except OSError as error:
+                failure.append(error)
+                ready.set()
+                return
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name="awacs-feed", daemon=True)
+        self.thread.start()
+        ready.wait()
+        if failure:
+            raise failure[0]
+        return self
+
+    async def _open(self):
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)  # Stale socket from an earlier run
+        sock = socket.socket(self.family, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        sock.bind(self.address)
+        self.transport, _ = await self.loop.create_datagram_endpoint(lambda: _FeedProtocol(self), sock=sock)
+
+    def stop(self):
+        if self.loop is None:
+            return
+        if self.transport is not None:
+            self.loop.call_soon_threadsafe(self.transport.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.loop = None
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def _receive(self, data):
+        # Feed thread: decode in bulk and queue; overload drops whole datagrams, oldest first
+        usable = len(data) - len(data) % REPORT.itemsize
+        reports = np.frombuffer(data, REPORT, usable // REPORT.itemsize)
+        with self.lock:
+            self.truncated += usable != len(data)
+            self.received += len(reports)
+            self.chunks.append((time.perf_counter(), reports))
+            self.pending += len(reports)
+            while self.pending > self.max_pending:
+                _, oldest = self.chunks.popleft()
+                self.pending -= len(oldest)
+                self.dropped += len(oldest)
+
+    def drain(self):
+        # Render thread: everything queued since the last drain, newest report per track, sorted by id
+        with self.lock:
+            chunks, self.chunks = self.chunks, deque()
+            depth, self.pending = self.pending, 0
+        self.depths.append(depth)
+        if not depth:
+            return np.empty(0, REPORT)
+        now = time.perf_counter()
+        self.latencies.append((now - chunks[0][0]) * 1000)
+        reports = np.concatenate([reports for _, reports in chunks])
+        ids = reports["track_id"][::-1]
+        _, last = np.unique(ids, return_index=True)
+        reports = reports[len(reports) - 1 - last]
+        self.coalesced += depth - len(reports)
+        self.ages.append((time.time() - float(reports["time"].min())) * 1000)
+        return reports
+
+    def apply(self, engine):
+        # Once per frame: write the coalesced reports into the engine's track table in one batch
+        if engine is not self.engine:
+            self.engine = engine
+            engine.retire_hooks.append(self.renumbered)
+        reports = self.drain()
+        if not len(reports):
+            return 0
+        valid = np.ones(len(reports), bool)
+        for name, limit in CODE_LIMITS.items():
+            valid &= reports[name] < limit
+        self.rejected += int(np.count_nonzero(~valid))
+        reports = reports[valid]
+        rows, fresh = self._rows(engine, reports["track_id"])
+        tracks = engine.tracks
+        old_angle = tracks.angle[rows].astype(np.float64)
+        changed = (tracks.type_code[rows] != reports["type_code"]) | (tracks.iff_code[rows] != reports["iff_code"])
+        for name in CODE_LIMITS:
+            engine.picture.retag(rows, name, reports[name])
+        for name in ("x", "y", "altitude", "heading", "speed"):
+            getattr(tracks, name)[rows] = reports[name]
+        tracks.jammed[rows] = reports["flags"] & JAMMED != 0
+        tracks.flared[rows] = reports["flags"] & FLARED != 0
+        x, y = tracks.x[rows], tracks.y[rows]
+        tracks.distance[rows] = np.hypot(x, y)
+        tracks.angle[rows] = np.degrees(np.arctan2(y, x)) % 360
+        jump = np.abs(tracks.angle[rows] - old_angle)
+        engine.relocated(float(np.minimum(jump, 360 - jump).max(initial=0)))
+        if self.on_spawn:
+            changed[fresh] = True
+            for row in np.unique(rows[changed]).tolist():
+                self.on_spawn(engine.targets[row])
+        self.applied += len(rows)
+        return len(rows)
+
+    def renumbered(self, renumber):
+        # Engine retire hook: follow tracks to their new rows; a retired track's id starts over if reported again
+        rows = renumber[self.rows]
+        alive = rows >= 0
+        self.ids, self.rows = self.ids[alive], rows[alive].astype(np.intp)
+
+    def _rows(self, engine, ids):
+        # Table rows for sorted feed ids, and the indices of the ids that got a new track view
+        pos = np.searchsorted(self.ids, ids)
+        known = pos < len(self.ids)
+        known[known] = self.ids[pos[known]] == ids[known]
+        rows = np.empty(len(ids), np.intp)
+        rows[known] = self.rows[pos[known]]
+        fresh = np.nonzero(~known)[0]
+        if len(fresh):
+            views = engine.spawn_batch(len(fresh), external=True)
+            for view, track_id in zip(views, ids[fresh].tolist()):
+                view.model = f"FEED {track_id}"
+            rows[fresh] = [view.row for view in views]
+            self.ids = np.concatenate((self.ids, ids[fresh]))
+            self.rows = np.concatenate((self.rows, rows[fresh]))
+            order = np.argsort(self.ids, kind="stable")
+            self.ids, self.rows = self.ids[order], self.rows[order]
+        return rows, fresh
+
+    def stats(self):
+        depth, latency, age = rolling_stats(self.depths), rolling_stats(self.latencies), rolling_stats(self.ages)
+        return {"received": self.received, "applied": self.applied, "coalesced": self.coalesced,
+                "dropped": self.dropped, "truncated": self.truncated, "rejected": self.rejected, "tracks": len(self.ids),
+                "depth_p50": depth["p50"], "depth_p99": depth["p99"], "depth_max": depth["max"],
+                "latency_p50_ms": latency["p50"], "latency_p99_ms": latency["p99"], "latency_max_ms": latency["max"],
+                "age_p50_ms": age["p50"], "age_p99_ms": age["p99"], "age_max_ms": age["max"]}
+
+
+def send(address, engine, rate, seconds):
+    # Stand-in surveillance source: runs a headless engine in real time and reports every track `rate` times a second
+    family, target = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_DGRAM)
+    sock.setblocking(False)
+    interval = 1 / rate
+    start = next_send = time.perf_counter()
+    sent = 0
+    while time.perf_counter() - start < seconds:
+        engine.step(interval)
+        reports = encode_reports(engine.tracks, np.arange(engine.tracks.count))
+        for first in range(0, len(reports), REPORTS_PER_DATAGRAM):
+            try:
+                sock.sendto(reports[first:first + REPORTS_PER_DATAGRAM].tobytes(), target)
+            except (BlockingIOError, ConnectionRefusedError, FileNotFoundError):
+                continue  # Receiver full or not up yet; the next update supersedes this one
+            sent += len(reports[first:first + REPORTS_PER_DATAGRAM])
+        next_send += interval
+        time.sleep(max(0.0, next_send - time.perf_counter()))
+    sock.close()
+    return sent
+
+
+def listen(address, seconds):
+    # Headless receiver: applies the feed to an empty engine once per tick and returns its stats
+    engine = SimEngine(aircraft=0, missiles=0, interceptors=0)
+    feed = FeedService(address).start()
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        feed.apply(engine)
+        engine.tick()
+        time.sleep(TICK)
+    feed.stop()
+    return {**feed.stats(), "detected": engine.picture.detected_count}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Send a synthetic AWACS track feed, or receive one headlessly and print its stats")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sender = commands.add_parser("send", help="report a headless scenario's tracks to a feed address")
+    sender.add_argument("address", help="udp://host:port or unix:///path")
+    sender.add_argument("--seed", type=int, default=0)
+    sender.add_argument("--aircraft", type=int, default=500)
+    sender.add_argument("--missiles", type=int, default=20)
+    sender.add_argument("--interceptors", type=int, default=5)
+    sender.add_argument("--rate", type=float, default=10, help="full updates per second")
+    sender.add_argument("--seconds", type=float, default=60)
+    receiver = commands.add_parser("listen", help="receive a feed into a headless engine")
+    receiver.add_argument("address")
+    receiver.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    if args.command == "send":
+        engine = SimEngine(seed=args.seed, aircraft=args.aircraft, missiles=args.missiles, interceptors=args.interceptors)
+        print(json.dumps({"sent": send(args.address, engine, args.rate, args.seconds)}))
+    else:
+        print(json.dumps(listen(args.address, args.seconds)))
@@ -0,0 +1,76 @@
+# Spatial indexes over a TrackTable: bearing buckets for the sweep and a uniform grid for picking
+
+import numpy as np
+
+GRID_OFFSET = 1 << 15  # Shifts scope coordinates positive so cell numbers truncate consistently
+GRID_STRIDE = 1 << 16
+
+
+# Rows sorted into fixed-width bearing buckets. Rebuilt only once tracks may have drifted
+# more than `slack` degrees; queries widen by the drift accumulated since the last rebuild.
+class BearingIndex:
+    def __init__(self, bucket=5, slack=5):
+        self.bucket = bucket
+        self.slack = slack
+        self.buckets = int(np.ceil(360 / bucket))
+        self.order = np.empty(0, np.intp)
+        self.starts = np.zeros(self.buckets + 1, np.intp)
+        self.drift = 0.0
+        self.size = -1
+        self.rebuilds = 0
+
+    def update(self, angle, drift):
+        self.drift += drift
+        if self.drift <= self.slack and len(angle) == self.size:
+            return
+        codes = (angle * (1 / self.bucket)).astype(np.int16)
+        np.minimum(codes, self.buckets - 1, out=codes)
+        self.order = np.argsort(codes, kind="stable")
+        self.starts[1:] = np.cumsum(np.bincount(codes, minlength=self.buckets))
+        self.drift = 0.0
+        self.size = len(angle)
+        self.rebuilds += 1
+
+    def invalidate(self):
+        self.size = -1
+
+    def rows_within(self, bearing, half_width):
+        # Candidate rows whose bearing may lie within half_width of bearing; caller does the exact test
+        half_width += self.drift
+        if half_width >= 180:
+            return self.order
+        first = int((bearing - half_width) // self.bucket) % self.buckets
+        last = int((bearing + half_width) // self.bucket) % self.buckets
+        if first <= last:
+            return self.order[self.starts[first]:self.starts[last + 1]]
+        return np.concatenate((self.order[self.starts[first]:], self.order[:self.starts[last + 1]]))
+
+
+# Uniform grid over scope coordinates for click picking and proximity queries
+class GridIndex:
+    def __init__(self, cell=50):
+        self.cell = cell
+        self.keys = np.empty(0, np.int64)
+        self.order = np.empty(0, np.intp)
+
+    def _cells(self, values):
+        return ((values + GRID_OFFSET) * (1 / self.cell)).astype(np.int64)
+
+    def update(self, x, y):
+        keys = self._cells(x) * GRID_STRIDE + self._cells(y)
+        self.order = np.argsort(keys)
+        self.keys = keys[self.order]
+
+    def query(self, x, y, radius, xs, ys):
+        # Rows within radius of (x, y), nearest first; xs/ys are the columns the grid was built from
+        cx = np.arange(int((x - radius + GRID_OFFSET) // self.cell), int((x + radius + GRID_OFFSET) // self.cell) + 1)
+        cy = np.arange(int((y - radius + GRID_OFFSET) // self.cell), int((y + radius + GRID_OFFSET) // self.cell) + 1)
+        cells = (cx[:, None] * GRID_STRIDE + cy[None, :]).ravel()
+        lo = np.searchsorted(self.keys, cells)
+        hi = np.searchsorted(self.keys, cells, side="right")
+        if not (hi - lo).any():
+            return np.empty(0, np.intp)
+        rows = np.concatenate([self.order[a:b] for a, b in zip(lo.tolist(), hi.tolist()) if b > a])
+        dist = np.hypot(xs[rows] - x, ys[rows] - y)
+        near = dist < radius
+        return rows[near][np.argsort(dist[near], kind="stable")]
@@ -0,0 +1,112 @@
+# Batched interceptor-to-threat assignment for awacs_sim
+
+import time
+from collections import deque
+import numpy as np
+from awacs_perf import rolling_stats
+from awacs_tracks import THREAT_LEVELS, INTERCEPTOR, HIGH, CRITICAL, MOVE_SCALE
+
+ASSIGN_INTERVAL = 30  # Ticks between solves (0.5 s at 60 ticks/s)
+THREAT_WEIGHT = np.ones(len(THREAT_LEVELS), np.float32)  # Time-to-intercept is divided by this, per threat level
+THREAT_WEIGHT[CRITICAL] = 2.0
+STICKY = 0.8  # Standing pairings count at this fraction of their cost, so they only change for a clear gain
+MIN_CLOSING = 0.05  # Scope units per tick; slower closure counts as no intercept
+
+
+def intercept_cost(tracks, interceptors, threats):
+    # Estimated ticks to intercept for every (interceptor, threat) pair, scaled down by threat level;
+    # inf where the interceptor cannot close
+    # range / (interceptor speed + threat speed toward the interceptor), as range^2 / (speed * range + v.d)
+    # so the pair matrix needs a single sqrt (np.hypot has no SIMD path for float32)
+    dx = tracks.x[interceptors][:, None] - tracks.x[threats][None, :]
+    dy = tracks.y[interceptors][:, None] - tracks.y[threats][None, :]
+    vx, vy = tracks.velocity(threats)
+    closing = vx * dx
+    closing += vy * dy
+    dx *= dx
+    dy *= dy
+    dx += dy
+    range_sq = dx
+    rng = np.sqrt(range_sq)
+    closing += rng * (tracks.speed[interceptors][:, None] * MOVE_SCALE)
+    rng *= MIN_CLOSING
+    slow = closing <= rng
+    range_sq /= THREAT_WEIGHT[tracks.threat_code[threats]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        range_sq /= closing
+    range_sq[slow] = np.inf
+    return range_sq
+
+
+def greedy_assign(cost):
+    # Greedy matching in ascending cost: each round takes every pair that is cheapest in both its row and
+    # its column (always including the global minimum), so rounds are vectorized and at most min(rows, cols)
+    rows, cols = np.arange(cost.shape[0]), np.arange(cost.shape[1])
+    matched_rows, matched_cols = [], []
+    while len(rows) and len(cols):
+        best_col = cost.argmin(1)
+        best_row = cost.argmin(0)
+        mutual = np.nonzero(best_row[best_col] == np.arange(len(rows)))[0]
+        mutual = mutual[np.isfinite(cost[mutual, best_col[mutual]])]
+        if not len(mutual):
+            break
+        matched_rows.append(rows[mutual])
+        matched_cols.append(cols[best_col[mutual]])
+        keep_rows = np.ones(len(rows), bool)
+        keep_rows[mutual] = False
+        keep_cols = np.ones(len(cols), bool)
+        keep_cols[best_col[mutual]] = False
+        cost = cost[keep_rows][:, keep_cols]
+        rows, cols = rows[keep_rows], cols[keep_cols]
+    if not matched_rows:
+        return np.empty(0, np.intp), np.empty(0, np.intp)
+    return np.concatenate(matched_rows), np.concatenate(matched_cols)
+
+
+def pinned(tracks):
+    # Mask of operator-launched interceptors still on a target
+    n = tracks.count
+    return tracks.manual[:n] & (tracks.target_row[:n] >= 0)
+
+
+# Reassigns every free-to-fly interceptor across the visible HIGH/CRITICAL tracks at a fixed cadence.
+# Only pairings that change are written to the table's target_row column. Interceptors the operator
+# launched (the manual column) and their targets are left out until the intercept ends or is released.
+class InterceptScheduler:
+    def __init__(self, interval=ASSIGN_INTERVAL, window=300):
+        self.interval = interval
+        self.enabled = False
+        self.solves = 0
+        self.changes = 0
+        self.times = deque(maxlen=window)  # Solve durations in ms
+        self.last = {"interceptors": 0, "threats": 0, "assigned": 0, "changed": 0, "manual": 0}
+
+    def due(self, tick):
+        return self.enabled and tick % self.interval == 0
+
+    def solve(self, tracks, visible):
+        start = time.perf_counter()
+        n = tracks.count
+        type_code, threat_code, target_row = tracks.type_code[:n], tracks.threat_code[:n], tracks.target_row[:n]
+        manual = pinned(tracks)
+        engaged = np.zeros(n, bool)
+        engaged[target_row[manual]] = True
+        interceptors = np.nonzero((type_code == INTERCEPTOR) & ~tracks.jammed[:n] & ~manual)[0]
+        threats = np.nonzero(visible & ((threat_code == HIGH) | (threat_code == CRITICAL)) & (type_code != INTERCEPTOR) & ~engaged)[0]
+        cost = intercept_cost(tracks, interceptors, threats)
+        cost[target_row[interceptors][:, None] == threats[None, :]] *= STICKY
+        matched, chosen = greedy_assign(cost)
+        assignment = np.full(len(interceptors), -1, np.int32)
+        assignment[matched] = threats[chosen]
+        changed = assignment != target_row[interceptors]
+        target_row[interceptors[changed]] = assignment[changed]
+        self.solves += 1
+        self.changes += int(np.count_nonzero(changed))
+        self.times.append((time.perf_counter() - start) * 1000)
+        self.last = {"interceptors": len(interceptors), "threats": len(threats), "assigned": len(matched), "changed": int(np.count_nonzero(changed)),
+                     "manual": int(np.count_nonzero(manual))}
+
+    def stats(self):
+        times = rolling_stats(self.times)
+        return {"solves": self.solves, "changes": self.changes, "p50_ms": times["p50"], "p99_ms": times["p99"],
+                "max_ms": times["max"], **self.last}
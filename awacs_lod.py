@@ -0,0 +1,92 @@
+# Level of detail for the scope: which detected contacts are drawn individually, which of those get
+# labels and trails, and which collapse into cluster symbols; plus the mini-map density raster
+
+import numpy as np
+from awacs_tracks import THREAT_LEVELS, LOW, MED, HIGH, CRITICAL, DEFENSE
+
+CLUSTER_CELL = 32  # Screen pixels per clustering cell at the finest level
+MAX_CELL = 256
+CLUSTER_MIN = 4  # Contacts sharing a cell before they collapse into one symbol
+DRAW_BUDGET = 400  # Symbols (contacts plus clusters) per frame; cells widen until the plan fits
+DETAIL_LIMIT = 60  # Contacts that get a label and trail, highest threat first, then nearest
+DENSITY_BIN = 4  # Mini-map pixels per density cell
+DENSITY_POINTS = 200  # Above this many contacts the mini-map shows density instead of dots
+THREAT_RANK = np.zeros(len(THREAT_LEVELS), np.int64)
+THREAT_RANK[[LOW, MED, DEFENSE, HIGH, CRITICAL]] = range(5)
+
+
+def priority_order(tracks, rows, limit):
+    # Up to `limit` of the rows by descending threat rank, then ascending range
+    key = THREAT_RANK[tracks.threat_code[rows]] * -1e6 + tracks.distance[rows]
+    if len(rows) > limit:
+        pick = np.argpartition(key, limit)[:limit]
+        rows, key = rows[pick], key[pick]
+    return rows[np.argsort(key, kind="stable")]
+
+
+# Screen-space clustering: contacts are binned into square cells and any cell holding CLUSTER_MIN or
+# more becomes one symbol at the members' centroid, led by its most threatening member. Zooming in
+# spreads contacts over more cells, so clusters break up on their own; when the plan still exceeds
+# the draw budget the cells are doubled until it fits.
+class ScopeLod:
+    def __init__(self, cell=CLUSTER_CELL, minimum=CLUSTER_MIN, budget=DRAW_BUDGET, detail=DETAIL_LIMIT):
+        self.cell = cell
+        self.minimum = minimum
+        self.budget = budget
+        self.detail_limit = detail
+        self.singles = np.empty(0, np.intp)
+        self.detail = np.empty(0, bool)  # Per single: draw label and trail
+        self.clusters = (np.empty(0), np.empty(0), np.empty(0, np.intp), np.empty(0, np.intp))  # x, y, size, lead row
+        self.last = {"visible": 0, "singles": 0, "clusters": 0, "cell": cell}
+
+    def plan(self, tracks, rows, zoom, center, bounds, keep=None):
+        # rows: detected rows; bounds: (left, top, right, bottom) of the scope on screen; keep: a row
+        # (the selected track) that is always drawn on its own with full detail
+        left, top, right, bottom = bounds
+        x = center[0] + tracks.x[rows] * zoom
+        y = center[1] - tracks.y[rows] * zoom
+        visible = (x >= left) & (x < right) & (y >= top) & (y < bottom)
+        rows, x, y = rows[visible], x[visible], y[visible]
+        cell = self.cell
+        while True:
+            cells = ((x - left) // cell).astype(np.int64) << 20 | ((y - top) // cell).astype(np.int64)
+            _, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+            clustered = counts[inverse] >= self.minimum
+            if keep is not None:
+                clustered &= rows != keep
+            groups = np.unique(inverse[clustered])
+            if np.count_nonzero(~clustered) + len(groups) <= self.budget or cell >= MAX_CELL:
+                break
+            cell *= 2
+        self.singles = rows[~clustered]
+        detail = priority_order(tracks, self.singles, self.detail_limit)
+        if keep is not None:
+            detail = np.append(detail, keep)
+        self.detail = np.isin(self.singles, detail)
+        members = np.nonzero(clustered)[0]
+        _, group, sizes = np.unique(inverse[members], return_inverse=True, return_counts=True)
+        cx = np.bincount(group, x[members]) / np.maximum(sizes, 1)
+        cy = np.bincount(group, y[members]) / np.maximum(sizes, 1)
+        member_rows = rows[members]
+        order = np.lexsort((tracks.distance[member_rows], -THREAT_RANK[tracks.threat_code[member_rows]], group))
+        leads = member_rows[order[np.cumsum(sizes) - sizes]]
+        self.clusters = (cx, cy, sizes, leads)
+        self.last = {"visible": len(rows), "singles": len(self.singles), "clusters": len(sizes), "cell": cell}
+        return self
+
+
+def density_raster(tracks, rows, radius, size, bin=DENSITY_BIN):
+    # RGB raster (x-major, as pygame.surfarray expects) of contact density over the scope disc:
+    # green for all contacts and red for HIGH/CRITICAL ones, log-scaled so sparse cells stay visible
+    bins = max(1, size // bin)
+    scale = 0.5 * bins / radius
+    ix = np.clip(((tracks.x[rows] + radius) * scale).astype(np.int64), 0, bins - 1)
+    iy = np.clip(((radius - tracks.y[rows]) * scale).astype(np.int64), 0, bins - 1)
+    cells = ix * bins + iy
+    threat = tracks.threat_code[rows]
+    counts = np.bincount(cells, minlength=bins * bins).reshape(bins, bins)
+    threats = np.bincount(cells, (threat == HIGH) | (threat == CRITICAL), bins * bins).reshape(bins, bins)
+    raster = np.zeros((bins, bins, 3), np.uint8)
+    raster[..., 1] = np.log1p(counts) * (220 / np.log1p(max(int(counts.max(initial=0)), 1)))
+    raster[..., 0] = np.log1p(threats) * (240 / np.log1p(max(threats.max(initial=0), 1)))
+    return raster
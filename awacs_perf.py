@@ -0,0 +1,53 @@
+# Per-stage frame timing for awacs_sim with rolling percentiles
+
+import time
+from collections import deque
+import numpy as np
+
+
+def rolling_stats(samples):
+    # {"p50", "p99", "mean", "max"} of a window of samples (e.g. a bounded deque); zeros while it is empty
+    values = np.fromiter(samples, np.float64, len(samples))
+    if not len(values):
+        return {"p50": 0.0, "p99": 0.0, "mean": 0.0, "max": 0.0}
+    p50, p99 = np.percentile(values, [50, 99])
+    return {"p50": float(p50), "p99": float(p99), "mean": float(values.mean()), "max": float(values.max())}
+
+
+# Call begin_frame() at the top of the loop and mark(stage) after each stage; a stage's time
+# is measured from the previous mark. "frame" holds whole-frame times.
+class FrameProfiler:
+    def __init__(self, window=300):
+        self.window = window
+        self.samples = {}
+        self.frames = 0
+        self._frame_start = None
+        self._last = None
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self._frame_start is not None:
+            self._record("frame", now - self._frame_start)
+        self._frame_start = self._last = now
+        self.frames += 1
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self._record(stage, now - self._last)
+        self._last = now
+
+    def _record(self, stage, seconds):
+        samples = self.samples.get(stage)
+        if samples is None:
+            samples = self.samples[stage] = deque(maxlen=self.window)
+        samples.append(seconds * 1000)
+
+    def reset(self):
+        self.samples.clear()
+
+    def stats(self):
+        # {stage: {"p50": ms, "p99": ms, "mean": ms, "max": ms}} over the rolling window
+        return {stage: rolling_stats(samples) for stage, samples in self.samples.items()}
+
+    def report_lines(self):
+        return [f"{stage:<10} {s['p50']:6.2f} {s['p99']:6.2f} ms" for stage, s in self.stats().items()]
@@ -0,0 +1,91 @@
+# Incrementally maintained air picture over a TrackTable, so status and HUD reads are O(1)
+
+import math
+import numpy as np
+from awacs_tracks import TYPES, IFF_STATES, THREAT_LEVELS, HIGH, CRITICAL
+
+CODES = {"type_code": len(TYPES), "threat_code": len(THREAT_LEVELS), "iff_code": len(IFF_STATES)}
+
+
+# Counts by type, threat level and IFF over all tracks and over the detected ones, plus the detected
+# set itself. Every detection is also filed in a timer wheel with one slot per tick of the detection
+# window, so it is looked at again exactly when it could expire instead of rescanning every track.
+# Expiry is decided in whole ticks (a track is detected while swept less than `slots` ticks ago).
+# Code columns must be changed through retag(); after rewriting the table wholesale call rebuild().
+class TrackPicture:
+    def __init__(self, tracks, window_ms, tick_rate):
+        self.tracks = tracks
+        self.tick_rate = tick_rate
+        self.slots = math.ceil(window_ms * tick_rate / 1000)
+        self.rebuild(0)
+
+    def _sweep_ticks(self, rows):
+        return np.rint(self.tracks.last_sweep[rows] * (self.tick_rate / 1000)).astype(np.int64)
+
+    def rebuild(self, tick):
+        self.detected = np.zeros(0, bool)
+        self.counts = {name: np.zeros(size, np.int64) for name, size in CODES.items()}
+        self.detected_counts = {name: np.zeros(size, np.int64) for name, size in CODES.items()}
+        self.wheel = [[] for _ in range(self.slots)]
+        self.add(np.arange(self.tracks.count), tick)
+
+    def _count(self, counts, rows, sign):
+        for name, size in CODES.items():
+            counts[name] += sign * np.bincount(getattr(self.tracks, name)[rows], minlength=size)
+
+    def add(self, rows, tick):
+        # New rows; any still inside the detection window (e.g. a fresh table at time 0) count as detected
+        if len(self.detected) < len(self.tracks.angle):
+            self.detected = np.concatenate((self.detected, np.zeros(len(self.tracks.angle) - len(self.detected), bool)))
+        self._count(self.counts, rows, 1)
+        sweep_ticks = self._sweep_ticks(rows)
+        live = tick - sweep_ticks < self.slots
+        rows = rows[live]
+        self.detected[rows] = True
+        self._count(self.detected_counts, rows, 1)
+        slots = sweep_ticks[live] % self.slots
+        order = np.argsort(slots, kind="stable")
+        first, starts = np.unique(slots[order], return_index=True)
+        for slot, group in zip(first.tolist(), np.split(rows[order], starts[1:])):
+            self.wheel[slot].append(group)
+
+    def retag(self, rows, name, codes):
+        # One row or an array of distinct rows
+        rows = np.atleast_1d(rows)
+        column = getattr(self.tracks, name)
+        old = column[rows]
+        column[rows] = codes
+        new = column[rows]
+        seen = self.detected[rows]
+        for counts, mask in ((self.counts, slice(None)), (self.detected_counts, seen)):
+            counts[name] += np.bincount(new[mask], minlength=CODES[name]) - np.bincount(old[mask], minlength=CODES[name])
+
+    def detect(self, rows, tick):
+        # Rows swept on this tick (their last_sweep already set)
+        fresh = rows[~self.detected[rows]]
+        self.detected[fresh] = True
+        self._count(self.detected_counts, fresh, 1)
+        self.wheel[tick % self.slots].append(rows)
+
+    def expire(self, tick):
+        # Drops detections filed one window ago that were not refreshed since
+        slot = self.wheel[tick % self.slots]
+        if not slot:
+            return
+        rows = np.concatenate(slot)
+        slot.clear()
+        rows = rows[self.detected[rows] & (tick - self._sweep_ticks(rows) >= self.slots)]
+        self.detected[rows] = False
+        self._count(self.detected_counts, rows, -1)
+
+    def rows(self):
+        return np.nonzero(self.detected[:self.tracks.count])[0]
+
+    @property
+    def hostile(self):
+        threat = self.detected_counts["threat_code"]
+        return int(threat[HIGH] + threat[CRITICAL])
+
+    @property
+    def detected_count(self):
+        return int(self.detected_counts["type_code"].sum())
@@ -0,0 +1,348 @@
+# Append-only binary session recording for awacs_sim and seekable replay over a memory map.
+#
+# Layout: a file header, then records of (kind, tick, track count, meta bytes, payload bytes) each
+# followed by a zlib payload holding a JSON meta blob and binary data. Keyframes store every track
+# column. In between, the simulation is deterministic given its RNG state, so a delta only stores
+# what re-running the tick would get wrong: a sparse residual over the raw column bits (operator
+# actions, spawns) plus any scalar that changed. Tracks retired after the tick (SimEngine.retire) are
+# listed in the delta and retired again on both sides, so renumbered rows cost no residual. Both sides
+# re-simulate the same way, so replay is exact and a quiet tick costs a few dozen bytes however many
+# tracks there are.
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+import numpy as np
+from awacs_engine import SimEngine, TICK_RATE
+from awacs_scenario import load_scenario
+from awacs_tracks import COLUMNS
+
+MAGIC = b"AWACSREC"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sHHI")  # Magic, version, tick rate, keyframe interval
+RECORD_HEADER = struct.Struct("<BIIII")  # Kind, tick, track count, meta bytes, payload bytes
+RESIDUAL_HEADER = struct.Struct("<BI")  # Column index, rows
+KEYFRAME, DELTA, ACTION = 1, 2, 3
+KEYFRAME_INTERVAL = 300  # Ticks between keyframes; bounds the ticks re-simulated after a seek
+SPEEDS = [1, 2, 4, 8, 16, 32, 64]
+COLUMN_NAMES = list(COLUMNS)
+UINTS = {1: np.uint8, 2: np.uint16, 4: np.uint32, 8: np.uint64}
+
+
+def _bits(column):
+    return column.view(UINTS[column.dtype.itemsize])
+
+
+def _scalars(engine):
+    return {"mode": engine.radar_mode, "selected": engine.selected.row if engine.selected is not None else -1,
+            "radius": engine.radius, "intercept": engine.intercept.enabled}
+
+
+def _prepare(engine, scalars):
+    engine.radar_mode = scalars["mode"]
+    engine.radius = scalars["radius"]
+    engine.intercept.enabled = scalars["intercept"]
+    row = scalars["selected"]
+    engine.selected = engine.targets[row] if 0 <= row < len(engine.targets) else None
+
+
+def _sync_views(engine, count):
+    # One view per recorded row; returns the views spawned, which the recorded state then overwrites
+    spawned = []
+    while len(engine.targets) < count:
+        spawned.append(engine.spawn())
+    if len(engine.targets) > count:
+        for view in engine.targets[count:]:
+            view.row = -1
+        del engine.targets[count:]
+        engine.tracks.count = count
+    return spawned
+
+
+def _extend(engine, count):
+    # Rows spawned since the last frame, zeroed: their residuals are whole values
+    first = engine.tracks.count
+    spawned = _sync_views(engine, count)
+    for name in COLUMN_NAMES:
+        _bits(getattr(engine.tracks, name))[first:count] = 0
+    return spawned
+
+
+def _advance(engine, count, retired):
+    # Re-simulate one recorded tick, then the spawns and retirements that followed it in order;
+    # returns the rows the spawned tracks ended up in, ascending
+    engine.tick()
+    spawned = []
+    for before, dropped in retired:
+        spawned += _extend(engine, before)
+        engine.retire(np.array(dropped, np.intp))
+    spawned += _extend(engine, count)
+    return sorted(view.row for view in spawned if view.row >= 0)
+
+
+def _restore(engine, tick, columns, meta, on_spawn=None):
+    # Put the engine in the exact state a keyframe describes
+    _sync_views(engine, len(meta["models"]))
+    for view, model in zip(engine.targets, meta["models"]):
+        view.model = model  # Rows may hold other tracks than before if some were retired
+    engine.tracks.load(columns)
+    engine.tracks.rng.bit_generator.state = meta["rng"]
+    engine.ticks = tick
+    engine.now = tick * 1000 / TICK_RATE
+    engine.sweep_angle = meta["sweep"]
+    engine.reindex()
+    _prepare(engine, meta)
+    if on_spawn:
+        for view in engine.targets:  # Compacted rows may have been reused by other tracks
+            on_spawn(view)
+
+
+def _residual(state, predicted):
+    # Sparse wrapping difference between the raw bits of recorded and re-simulated columns
+    parts = []
+    for index, name in enumerate(COLUMN_NAMES):
+        actual = _bits(state[name])
+        guess = _bits(predicted[name])
+        if len(guess) < len(actual):
+            guess = np.concatenate((guess, np.zeros(len(actual) - len(guess), guess.dtype)))
+        diff = actual - guess
+        rows = np.nonzero(diff)[0].astype(np.int32)
+        if len(rows):
+            parts += [RESIDUAL_HEADER.pack(index, len(rows)), rows.tobytes(), diff[rows].tobytes()]
+    return b"".join(parts)
+
+
+def _correct(tracks, blob, offset):
+    while offset < len(blob):
+        index, n = RESIDUAL_HEADER.unpack_from(blob, offset)
+        offset += RESIDUAL_HEADER.size
+        bits = _bits(getattr(tracks, COLUMN_NAMES[index]))
+        rows = np.frombuffer(blob, np.int32, n, offset)
+        offset += rows.nbytes
+        diff = np.frombuffer(blob, bits.dtype, n, offset)
+        offset += diff.nbytes
+        bits[rows] += diff
+
+
+# attach() registers it with an engine (capture() after every tick, renumbered() after every
+# retirement). A private shadow engine re-simulates every tick exactly as Replay will, and only its
+# mistakes are written.
+class Recorder:
+    def __init__(self, path, keyframe_interval=KEYFRAME_INTERVAL, level=1):
+        self.file = open(path, "wb")
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, TICK_RATE, keyframe_interval))
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self.shadow = SimEngine(aircraft=0, missiles=0, interceptors=0, history_depth=1)
+        self.scalars = None
+        self.retired = []  # [rows before, rows dropped] per retirement since the last capture
+        self.frames = 0
+
+    def attach(self, engine):
+        engine.tick_hooks.append(self.capture)
+        engine.retire_hooks.append(self.renumbered)
+        return self
+
+    def renumbered(self, renumber):
+        self.retired.append([len(renumber), np.nonzero(renumber < 0)[0].tolist()])
+
+    def capture(self, engine):
+        tracks, shadow = engine.tracks, self.shadow
+        state = tracks.snapshot()
+        n = tracks.count
+        scalars = _scalars(engine)
+        retired, self.retired = self.retired, []
+        if (self.scalars is None or engine.ticks % self.keyframe_interval == 0
+                or n < shadow.tracks.count - sum(len(dropped) for _, dropped in retired)):
+            models = [getattr(view, "model", "") for view in engine.targets]
+            meta = {**scalars, "models": models, "sweep": engine.sweep_angle, "rng": tracks.rng.bit_generator.state}
+            self._write(KEYFRAME, engine.ticks, n, meta, b"".join(state[name].tobytes() for name in COLUMN_NAMES))
+            _restore(shadow, engine.ticks, state, meta)
+        else:
+            meta = {key: value for key, value in scalars.items() if value != self.scalars[key]}
+            if retired:
+                meta["retired"] = retired
+            _prepare(shadow, scalars)
+            fresh = _advance(shadow, n, retired)
+            meta["models"] = [getattr(engine.targets[row], "model", "") for row in fresh]
+            data = _residual(state, shadow.tracks.snapshot())
+            shadow.tracks.load(state)
+            if data:
+                shadow.picture.rebuild(shadow.ticks)
+            if shadow.tracks.rng.bit_generator.state != tracks.rng.bit_generator.state:
+                meta["rng"] = shadow.tracks.rng.bit_generator.state = tracks.rng.bit_generator.state  # Consumed by an operator action
+            self._write(DELTA, engine.ticks, n, meta, data)
+        self.scalars = scalars
+        self.frames += 1
+
+    def action(self, tick, text):
+        self._write(ACTION, tick, 0, {"text": text}, b"")
+
+    def _write(self, kind, tick, count, meta, data):
+        blob = json.dumps(meta, separators=(",", ":")).encode()
+        payload = zlib.compress(blob + data, self.level)
+        self.file.write(RECORD_HEADER.pack(kind, tick, count, len(blob), len(payload)))
+        self.file.write(payload)
+
+    def close(self):
+        self.file.close()
+
+
+# Drives an engine from a recording; the UI draws it as if the simulation were live.
+# on_spawn(view) is called for every track view when a keyframe is restored, and for each track view
+# created to hold a recorded row.
+class Replay:
+    def __init__(self, path, engine, on_spawn=None):
+        self.engine = engine
+        self.on_spawn = on_spawn
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, tick_rate, self.keyframe_interval = FILE_HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION or tick_rate != TICK_RATE:
+            raise ValueError(f"{path} is not a compatible awacs_sim recording")
+        self._index()
+        if not len(self.keyframes):
+            raise ValueError(f"{path} holds no keyframes")
+        self.speed = 1
+        self.paused = False
+        self.frame = -1
+        self.scalars = None
+        self._backlog = 0.0
+
+    def _index(self):
+        # One pass over the record headers; a truncated tail from an interrupted session is ignored
+        frames, keyframes, actions = [], [], []
+        offset, end = FILE_HEADER.size, len(self.data)
+        while offset + RECORD_HEADER.size <= end:
+            kind, tick, _, _, size = RECORD_HEADER.unpack_from(self.data, offset)
+            if offset + RECORD_HEADER.size + size > end:
+                break
+            if kind == ACTION:
+                actions.append((tick, offset))
+            else:
+                if kind == KEYFRAME:
+                    keyframes.append(len(frames))
+                frames.append((tick, offset))
+            offset += RECORD_HEADER.size + size
+        self.frame_ticks, self.frame_offsets = np.array(frames, np.int64).reshape(-1, 2).T
+        self.action_ticks, self.action_offsets = np.array(actions, np.int64).reshape(-1, 2).T
+        self.keyframes = np.array(keyframes, np.intp)
+
+    @property
+    def first_tick(self):
+        return int(self.frame_ticks[self.keyframes[0]])
+
+    @property
+    def last_tick(self):
+        return int(self.frame_ticks[-1])
+
+    @property
+    def tick(self):
+        return int(self.frame_ticks[self.frame]) if self.frame >= 0 else self.first_tick
+
+    def _read(self, offset):
+        kind, tick, count, meta_size, size = RECORD_HEADER.unpack_from(self.data, offset)
+        start = offset + RECORD_HEADER.size
+        blob = zlib.decompress(self.data[start:start + size])
+        return kind, tick, count, json.loads(blob[:meta_size]), blob, meta_size
+
+    def _apply(self, frame):
+        kind, tick, count, meta, blob, offset = self._read(int(self.frame_offsets[frame]))
+        engine = self.engine
+        if kind == KEYFRAME:
+            columns = {}
+            for name, (dtype, _) in COLUMNS.items():
+                columns[name] = np.frombuffer(blob, dtype, count, offset)
+                offset += columns[name].nbytes
+            self.scalars = {key: meta[key] for key in ("mode", "selected", "radius", "intercept")}
+            _restore(engine, tick, columns, meta, self.on_spawn)
+        else:
+            self.scalars.update((key, meta[key]) for key in ("mode", "selected", "radius", "intercept") if key in meta)
+            _prepare(engine, self.scalars)
+            fresh = _advance(engine, count, meta.get("retired", []))
+            _prepare(engine, self.scalars)  # The selection may be a row spawned this tick
+            _correct(engine.tracks, blob, offset)
+            if offset < len(blob):
+                engine.picture.rebuild(engine.ticks)
+            for row, model in zip(fresh, meta["models"]):
+                engine.targets[row].model = model
+                if self.on_spawn:
+                    self.on_spawn(engine.targets[row])
+            if "rng" in meta:
+                engine.tracks.rng.bit_generator.state = meta["rng"]
+        self.frame = frame
+
+    def seek(self, tick):
+        # Show the last frame at or before `tick`. Short forward moves re-simulate frame by frame
+        # (returning the operator actions passed); anything else restarts from the nearest keyframe.
+        frame = max(int(np.searchsorted(self.frame_ticks, tick, "right")) - 1, int(self.keyframes[0]))
+        if frame == self.frame:
+            return []
+        start_tick = self.tick
+        sequential = 0 <= self.frame < frame <= self.frame + self.keyframe_interval
+        if not sequential:
+            self.engine.tracks.history.written[:] = 0  # Trails restart from the keyframe
+            self.frame = int(self.keyframes[np.searchsorted(self.keyframes, frame, "right") - 1]) - 1
+        for i in range(self.frame + 1, frame + 1):
+            self._apply(i)
+        if not sequential:
+            return []
+        passed = slice(np.searchsorted(self.action_ticks, start_tick, "right"), np.searchsorted(self.action_ticks, self.tick, "right"))
+        return [self._read(int(offset))[3]["text"] for offset in self.action_offsets[passed]]
+
+    def advance(self, dt):
+        # Play dt seconds of wall time at the current speed; returns the operator actions passed
+        if self.paused:
+            return []
+        self._backlog += dt * TICK_RATE * self.speed
+        ticks = int(self._backlog)
+        self._backlog -= ticks
+        return self.seek(self.tick + ticks) if ticks else []
+
+    def faster(self, steps=1):
+        self.speed = SPEEDS[min(max(SPEEDS.index(self.speed) + steps, 0), len(SPEEDS) - 1)]
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def info(self):
+        ticks = self.last_tick - self.first_tick + 1
+        return {"ticks": ticks, "duration_s": ticks / TICK_RATE, "frames": len(self.frame_ticks),
+                "keyframes": len(self.keyframes), "actions": len(self.action_ticks), "bytes": len(self.data),
+                "bytes_per_tick": len(self.data) / ticks}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Record headless AWACS sessions or summarize a recording")
+    commands = parser.add_subparsers(dest="command", required=True)
+    record = commands.add_parser("record", help="run a headless session and record every tick")
+    record.add_argument("path")
+    record.add_argument("--seed", type=int, default=0)
+    record.add_argument("--ticks", type=int, default=TICK_RATE * 60)
+    record.add_argument("--aircraft", type=int, default=20)
+    record.add_argument("--missiles", type=int, default=5)
+    record.add_argument("--interceptors", type=int, default=2)
+    record.add_argument("--keyframe-interval", type=int, default=KEYFRAME_INTERVAL)
+    record.add_argument("--scenario", help="stream tracks from this scenario file (its seed replaces --seed)")
+    info = commands.add_parser("info", help="print a JSON summary of a recording")
+    info.add_argument("path")
+    args = parser.parse_args()
+    if args.command == "record":
+        if args.scenario:
+            scenario = load_scenario(args.scenario)
+            engine = SimEngine(seed=scenario.seed, aircraft=0, missiles=0, interceptors=0)
+            scenario.attach(engine)
+        else:
+            engine = SimEngine(seed=args.seed, aircraft=args.aircraft, missiles=args.missiles, interceptors=args.interceptors)
+        recorder = Recorder(args.path, args.keyframe_interval).attach(engine)
+        engine.run(args.ticks)
+        recorder.close()
+        print(json.dumps({**engine.summary(), "bytes": os.path.getsize(args.path)}))
+    else:
+        replay = Replay(args.path, SimEngine(aircraft=0, missiles=0, interceptors=0))
+        print(json.dumps(replay.info()))
+        replay.close()
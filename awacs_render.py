@@ -0,0 +1,204 @@
+# Rendering helpers for the awacs_sim scope
+
+from collections import OrderedDict
+import numpy as np
+import pygame
+
+DOT_KERNEL = [(dx, dy) for dx in range(-3, 4) for dy in range(-3, 4) if dx * dx + dy * dy <= 9]  # Radius-3 noise dot
+
+
+# Fonts keyed by (face, size); cleared on resolution change
+class FontRegistry:
+    def __init__(self):
+        self._fonts = {}
+
+    def get(self, face, size):
+        font = self._fonts.get((face, size))
+        if font is None:
+            font = self._fonts[(face, size)] = pygame.font.SysFont(face, size)
+        return font
+
+    def clear(self):
+        self._fonts.clear()
+
+
+# LRU-bounded cache of rendered text surfaces keyed by (string, face, size, color)
+class TextCache:
+    def __init__(self, fonts=None, capacity=1024):
+        self.fonts = fonts if fonts is not None else FontRegistry()
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def render(self, text, face, size, color):
+        key = (text, face, size, color)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = self._surfaces[key] = self.fonts.get(face, size).render(text, True, color)
+        if len(self._surfaces) > self.capacity:
+            self._surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self._surfaces.clear()
+        self.fonts.clear()
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
+# Static scope layer baked once per key (e.g. resolution and zoom) and cropped to its drawn area
+class StaticLayer:
+    def __init__(self, draw):
+        self.draw = draw
+        self.key = None
+        self.surface = None
+        self.rect = None
+
+    def blit(self, screen, key):
+        if key != self.key:
+            layer = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+            self.draw(layer)
+            self.rect = layer.get_bounding_rect()
+            self.surface = layer.subsurface(self.rect).convert_alpha()
+            self.key = key
+        screen.blit(self.surface, self.rect)
+
+    def invalidate(self):
+        self.key = None
+
+
+# Rotated copies of large background surfaces, quantized to a fixed angular step and LRU-bounded
+class RotationCache:
+    def __init__(self, step=1.0, capacity=40):
+        self.step = step
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._frames = OrderedDict()
+
+    def get(self, name, surface, angle):
+        key = (name, round(angle / self.step) * self.step % 360)
+        frame = self._frames.get(key)
+        if frame is not None:
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return frame
+        self.misses += 1
+        frame = self._frames[key] = pygame.transform.rotate(surface, key[1]).convert_alpha()
+        if len(self._frames) > self.capacity:
+            self._frames.popitem(last=False)
+        return frame
+
+    def blit(self, screen, name, surface, angle, center):
+        frame = self.get(name, surface, angle)
+        screen.blit(frame, frame.get_rect(center=center))
+
+    def clear(self):
+        self._frames.clear()
+
+
+# Radar noise synthesized up front: a few additive RGB textures per intensity profile, slightly
+# larger than the noise area so each frame can blit a random offset of a random texture.
+# profiles maps name -> (dots per 1920x1080 pixels, alpha); frame cost is one add-blit whatever the density.
+class NoisePool:
+    def __init__(self, rect, color, profiles, frames=4, margin=64, seed=None, cache=None):
+        # A profile's textures are made on its first blit; with a seed and an AssetCache they are
+        # loaded from disk when this size was made before
+        self.rect = pygame.Rect(rect)
+        self.margin = margin
+        self.color = color
+        self.profiles = profiles
+        self.frames = frames
+        self.seed = seed
+        self.cache = cache
+        self.rng = np.random.default_rng(seed)
+        self.textures = {}
+
+    def _textures(self, name):
+        dots, alpha = self.profiles[name]
+        w, h = self.rect.w + self.margin, self.rect.h + self.margin
+        textures = []
+        for frame in range(self.frames):
+            def build(frame=frame):
+                rng = np.random.default_rng([self.seed, dots, alpha, frame]) if self.seed is not None else self.rng
+                return self._synthesize(rng, self.color, dots, alpha)
+            if self.cache is not None and self.seed is not None:
+                textures.append(self.cache.surface(("noise", w, h, *self.color, dots, alpha, frame, self.seed), build, alpha=False))
+            else:
+                textures.append(build().convert())
+        return textures
+
+    def _synthesize(self, rng, color, dots, alpha):
+        w, h = self.rect.w + self.margin, self.rect.h + self.margin
+        count = int(dots * w * h / (1920 * 1080))
+        xs, ys = rng.integers(0, w, count), rng.integers(0, h, count)
+        level = np.zeros((w, h), np.uint8)
+        for dx, dy in DOT_KERNEL:
+            level[np.clip(xs + dx, 0, w - 1), np.clip(ys + dy, 0, h - 1)] = alpha
+        rgb = (level[:, :, None] * (np.array(color, np.float32) / 255)).astype(np.uint8)
+        texture = pygame.Surface((w, h))
+        pygame.surfarray.blit_array(texture, rgb)
+        return texture
+
+    def blit(self, screen, profile):
+        textures = self.textures.get(profile)
+        if textures is None:
+            textures = self.textures[profile] = self._textures(profile)
+        texture = textures[self.rng.integers(len(textures))]
+        ox, oy = self.rng.integers(0, self.margin, 2)
+        screen.blit(texture, self.rect, pygame.Rect(int(ox), int(oy), self.rect.w, self.rect.h), special_flags=pygame.BLEND_RGB_ADD)
+
+
+# Retained HUD widget: its surface is re-rendered only when the bound value changes.
+# render(value) returns a surface drawn at pos, or None to hide the widget.
+class Widget:
+    def __init__(self, pos, render):
+        self.pos = pos
+        self.render = render
+        self.value = Widget  # Never bound
+        self.surface = None
+        self.rect = pygame.Rect(pos, (0, 0))
+
+    def bind(self, value):
+        # Returns the screen areas that need recompositing
+        if value == self.value:
+            return []
+        old_rect = self.rect
+        self.value = value
+        self.surface = self.render(value) if value is not None else None
+        self.rect = self.surface.get_rect(topleft=self.pos) if self.surface is not None else pygame.Rect(self.pos, (0, 0))
+        return [rect for rect in (old_rect, self.rect) if rect.w and rect.h]
+
+
+# Z-ordered widgets (in insertion order) composited over the screen; only changed areas are redrawn
+class RetainedPanel:
+    def __init__(self):
+        self.widgets = {}
+        self.dirty = []
+        self.renders = 0
+
+    def add(self, name, pos, render):
+        self.widgets[name] = Widget(pos, render)
+
+    def bind(self, name, value):
+        changed = self.widgets[name].bind(value)
+        self.renders += bool(changed)
+        self.dirty += changed
+
+    def compose(self, screen, always=()):
+        # Re-blit every widget overlapping a dirty area (plus the `always` areas); returns those areas
+        rects = self.dirty + list(always)
+        self.dirty = []
+        for rect in rects:
+            screen.set_clip(rect)
+            for widget in self.widgets.values():
+                if widget.surface is not None and widget.rect.colliderect(rect):
+                    screen.blit(widget.surface, widget.rect)
+        screen.set_clip(None)
+        return rects
@@ -0,0 +1,281 @@
+# Seeded scenario files for awacs_sim: timed raids, civilian traffic flows and interceptor bases,
+# streamed into an engine instead of a random population.
+#
+# A scenario is JSON:
+#   {"seed": 7, "duration_s": 10800,
+#    "raids": [{"at_s": 60, "count": 40, "interval_s": 1.5, "bearing": 20, "spread": 8, "range": 150,
+#               "type": "HOSTILE", "threat": "HIGH", "speed": [2, 4], "altitude": [15000, 35000]}],
+#    "flows": [{"start_s": 0, "end_s": 10800, "per_minute": 30, "bearing": 80, "spread": 40, "type": "CIVILIAN"}],
+#    "bases": [{"at_s": 0, "bearing": 200, "distance": 250, "interceptors": 6}]}
+# Raid members launch `interval_s` apart, `range` scope units outside the radar, and arrive at its edge
+# when their speed brings them there; once at the inner limit they hold for `dwell_s` (60 by default for
+# HOSTILE and UNKNOWN raids, the window the interceptors have). Flows are Poisson arrivals at the edge
+# across a sector of bearings; bases put interceptors on the scope. Every raid, flow and base draws from its own generator seeded by
+# (seed, kind, index) and only starts generating once its start time comes, so nothing is held ahead of
+# time but the members of raids in progress. A track is materialized on the tick it reaches the radar,
+# and retired once it flies out past the edge, reaches the inner limit (arrived) or is shot down, so
+# memory follows the active set however long the scenario runs. The same file, seed and radar radius
+# always produce the same track histories.
+
+import argparse
+import hashlib
+import heapq
+import json
+import time
+import numpy as np
+from awacs_engine import SimEngine, Track, TICK_RATE
+from awacs_tracks import TYPES, IFF_STATES, THREAT_LEVELS, INTERCEPTOR, PENDING, MOVE_SCALE, INNER_LIMIT
+
+# Defaults by track type, matching the random population: speed, altitude, radar cross section, ELINT
+KINDS = {
+    "aircraft": {"speed": (1, 5), "altitude": (10000, 45000), "rcs": (0.5, 5.0), "elint": (100, 500)},
+    "MISSILE": {"speed": (8, 20), "altitude": (500, 6000), "rcs": (0.1, 0.1), "elint": (50, 50), "threat": "CRITICAL"},
+    "INTERCEPTOR": {"speed": (20, 30), "altitude": (500, 6000), "rcs": (0.05, 0.05), "elint": (0, 0), "threat": "DEFENSE"},
+}
+FLOW_CHUNK = 256  # Flow arrivals drawn per batch
+RETIRE_INTERVAL = 30  # Ticks between checks for tracks that left; shot-down tracks go at once
+RAID_DWELL = 60  # s a HOSTILE or UNKNOWN raid holds at the inner limit unless the raid says otherwise
+ROW_STATE = {"ids": -1, "dwell": 0, "arrived": -1}  # Per table row: scenario track id (-1: not ours), ticks to hold, tick it reached the inner limit
+
+
+def load_scenario(path, digest=False):
+    with open(path) as f:
+        return Scenario(json.load(f), digest)
+
+
+def _codes(spec, rng, count):
+    # Type, IFF and threat codes plus the per-type defaults for one raid, flow or base
+    name = spec.get("type", "HOSTILE")
+    if name not in TYPES:
+        raise ValueError(f"unknown track type {name!r} (one of {', '.join(TYPES)})")
+    kind = KINDS.get(name, KINDS["aircraft"])
+    threat = spec.get("threat", kind.get("threat"))
+    if threat is None:
+        threat = "LOW" if name in ("FRIEND", "CIVILIAN") else None
+    if threat is not None and threat not in THREAT_LEVELS:
+        raise ValueError(f"unknown threat level {threat!r} (one of {', '.join(THREAT_LEVELS)})")
+    codes = {
+        "type_code": np.full(count, TYPES.index(name)),
+        "iff_code": np.full(count, PENDING if name == "UNKNOWN" else IFF_STATES.index(name)),
+        "threat_code": (np.full(count, THREAT_LEVELS.index(threat)) if threat is not None
+                        else rng.choice([THREAT_LEVELS.index("MED"), THREAT_LEVELS.index("HIGH")], count)),
+    }
+    return name, kind, codes
+
+
+def _members(spec, rng, count, angle, heading_spread):
+    # Per-track columns for `count` tracks entering at bearings `angle`, headed inbound give or take
+    # heading_spread degrees. (Headings here are relative to the bearing: -90 flies straight in.)
+    name, kind, columns = _codes(spec, rng, count)
+    speed = rng.uniform(*spec.get("speed", kind["speed"]), count)
+    columns.update(
+        angle=angle,
+        speed=speed,
+        heading=(angle - 90 + rng.uniform(-heading_spread, heading_spread, count)) % 360,
+        altitude=rng.integers(*(int(v) for v in spec.get("altitude", kind["altitude"])), count, endpoint=True),
+        radar_cross_section=rng.uniform(*kind["rcs"], count),
+        elint_signature=rng.integers(*kind["elint"], count, endpoint=True),
+    )
+    models = Track.AIRCRAFT_TYPES[name]
+    columns["model"] = [models[i] for i in rng.integers(len(models), size=count).tolist()]
+    columns["dwell"] = np.full(count, round(spec.get("dwell_s", RAID_DWELL if name in ("HOSTILE", "UNKNOWN") else 0) * TICK_RATE))
+    return columns
+
+
+def _rows(columns, order):
+    for i in order:
+        yield {name: values[i] for name, values in columns.items()}
+
+
+def raid(spec, rng):
+    # Members sorted by the tick they reach the radar edge
+    count = int(spec.get("count", 1))
+    spread = spec.get("spread", 5)
+    angle = (spec.get("bearing", 0) + rng.uniform(-spread, spread, count)) % 360
+    columns = _members(spec, rng, count, angle, spec.get("heading_spread", 5))
+    launch = spec.get("at_s", 0) + np.arange(count) * spec.get("interval_s", 1.0)
+    arrival = launch + spec.get("range", 0) / (columns["speed"] * MOVE_SCALE * TICK_RATE)
+    ticks = np.ceil(arrival * TICK_RATE).astype(np.int64)
+    order = np.argsort(ticks, kind="stable")
+    for i, member in zip(order.tolist(), _rows(columns, order.tolist())):
+        yield int(ticks[i]), member
+
+
+def flow(spec, rng, end_s):
+    # Poisson arrivals at the edge, drawn FLOW_CHUNK at a time
+    gap = 60 / spec["per_minute"]
+    spread = spec.get("spread", 30)
+    clock = spec.get("start_s", 0)
+    end_s = spec.get("end_s", end_s)
+    while True:
+        arrival = clock + np.cumsum(rng.exponential(gap, FLOW_CHUNK))
+        clock = float(arrival[-1])
+        angle = (spec.get("bearing", 0) + rng.uniform(-spread, spread, FLOW_CHUNK)) % 360
+        columns = _members({"type": "CIVILIAN", "dwell_s": 0, **spec}, rng, FLOW_CHUNK, angle, spec.get("heading_spread", 60))
+        for t, member in zip(arrival.tolist(), _rows(columns, range(FLOW_CHUNK))):
+            if end_s is not None and t > end_s:
+                return
+            yield int(np.ceil(t * TICK_RATE)), member
+
+
+def base(spec, rng):
+    count = int(spec.get("interceptors", 2))
+    columns = _members({**spec, "type": "INTERCEPTOR"}, rng, count, np.full(count, spec.get("bearing", 0) % 360), 180)
+    columns["distance"] = np.full(count, spec.get("distance", 0))
+    tick = int(np.ceil(spec.get("at_s", 0) * TICK_RATE))
+    for member in _rows(columns, range(count)):
+        yield tick, member
+
+
+# Streams a scenario into an engine: attach() registers update() as the engine's first tick hook,
+# so recorders and snapshots see this tick's arrivals and retirements. on_spawn(view) is called for
+# each track view created, once its columns are written.
+class Scenario:
+    def __init__(self, spec, digest=False):
+        self.spec = spec
+        self.seed = int(spec.get("seed", 0))
+        self.duration_s = spec.get("duration_s")
+        self.streams = []  # (start tick, stream number, generator factory), soonest last
+        for kind, (name, make) in enumerate([("raids", raid), ("flows", lambda s, r: flow(s, r, self.duration_s)), ("bases", base)]):
+            for index, item in enumerate(spec.get(name, [])):
+                start = item.get("start_s", item.get("at_s", 0))
+                rng = np.random.default_rng([self.seed, kind, index])
+                self.streams.append((int(np.floor(start * TICK_RATE)), len(self.streams), lambda m=make, s=item, r=rng: m(s, r)))
+        self.streams.sort(reverse=True)
+        self.queue = []  # (tick, stream number, track, generator) for the next arrival of each open stream
+        for name, default in ROW_STATE.items():
+            setattr(self, name, np.full(64, default, np.int64))
+        self.engine = None
+        self.on_spawn = None
+        self.spawned = self.left = self.downed = self.peak = 0
+        self.digest = hashlib.sha256() if digest else None  # Over the histories of retired, then remaining, tracks
+
+    def attach(self, engine, on_spawn=None):
+        self.engine = engine
+        self.on_spawn = on_spawn
+        engine.tick_hooks.insert(0, self.update)
+        self.update(engine)  # Arrivals at time 0 are on the scope from the start
+        return self
+
+    @property
+    def ended(self):
+        # Nothing left to arrive
+        return not self.streams and not self.queue
+
+    def update(self, engine):
+        tick = engine.ticks
+        self._fit(engine.tracks)
+        while self.streams and self.streams[-1][0] <= tick:
+            _, number, make = self.streams.pop()
+            self._next(number, make())
+        arrivals = []
+        while self.queue and self.queue[0][0] <= tick:
+            _, number, member, stream = heapq.heappop(self.queue)
+            arrivals.append(member)
+            self._next(number, stream)
+        if arrivals:
+            self._materialize(engine, arrivals)
+        downed = engine.tracks.downed
+        if len(downed) or tick % RETIRE_INTERVAL == 0:
+            self._retire(engine, downed)
+        self.peak = max(self.peak, engine.tracks.count)
+
+    def _fit(self, tracks):
+        # Per-row state as long as the table's columns
+        for name, default in ROW_STATE.items():
+            column = getattr(self, name)
+            if len(column) < len(tracks.angle):
+                setattr(self, name, np.concatenate((column, np.full(len(tracks.angle) - len(column), default, np.int64))))
+
+    def _next(self, number, stream):
+        for arrival_tick, member in stream:
+            heapq.heappush(self.queue, (arrival_tick, number, member, stream))
+            return
+
+    def _materialize(self, engine, arrivals):
+        # One batch of rows per tick, written with the arrivals' columns
+        columns = {name: np.array([a[name] for a in arrivals]) for name in
+                   ("angle", "speed", "heading", "altitude", "radar_cross_section", "elint_signature", "type_code", "iff_code", "threat_code")}
+        columns["distance"] = np.minimum([a.get("distance", engine.radius) for a in arrivals], engine.radius)
+        views = engine.spawn_batch(len(arrivals), **columns)
+        rows = np.array([view.row for view in views], np.intp)
+        self._fit(engine.tracks)
+        self.ids[rows] = np.arange(self.spawned, self.spawned + len(rows))
+        self.dwell[rows] = [a["dwell"] for a in arrivals]
+        self.arrived[rows] = -1
+        self.spawned += len(rows)
+        for view, arrival in zip(views, arrivals):
+            view.model = arrival["model"]
+            if self.on_spawn:
+                self.on_spawn(view)
+
+    def _retire(self, engine, downed):
+        tracks, n = engine.tracks, engine.tracks.count
+        ids = self.ids[:n]
+        relative = np.sin(np.radians(tracks.heading[:n] - tracks.angle[:n]))
+        distance = tracks.distance[:n]
+        arrived = self.arrived[:n]
+        arrived[(arrived < 0) & (distance <= INNER_LIMIT) & (relative < 0)] = engine.ticks
+        gone = ((distance >= engine.radius) & (relative > 0)) | ((arrived >= 0) & (engine.ticks - arrived >= self.dwell[:n]))
+        gone &= (ids >= 0) & (tracks.type_code[:n] != INTERCEPTOR)
+        self.left += int(np.count_nonzero(gone))
+        shot = np.zeros(n, bool)
+        shot[downed] = True
+        shot &= (ids >= 0) & ~gone
+        self.downed += int(np.count_nonzero(shot))
+        rows = np.nonzero(gone | shot)[0]
+        if not len(rows):
+            return
+        if self.digest is not None:
+            self._fold(tracks, rows)
+        renumber = engine.retire(rows)
+        kept = np.nonzero(renumber >= 0)[0]
+        for name, default in ROW_STATE.items():
+            column = getattr(self, name)
+            column[renumber[kept]] = column[kept]
+            column[tracks.count:n] = default
+
+    def _fold(self, tracks, rows):
+        # Add the full sampled history of these tracks to the digest, in track id order
+        history = tracks.history
+        for row in rows[np.argsort(self.ids[rows])].tolist():
+            self.digest.update(self.ids[row].tobytes())
+            for name in history.COLUMNS:
+                self.digest.update(history.series(row, name).tobytes())
+
+    def finish(self):
+        # Digest of every track history so far, including the tracks still active
+        if self.digest is None:
+            return None
+        self._fold(self.engine.tracks, np.nonzero(self.ids[:self.engine.tracks.count] >= 0)[0])
+        return self.digest.hexdigest()
+
+    def stats(self):
+        return {"spawned": self.spawned, "active": int(np.count_nonzero(self.ids[:self.engine.tracks.count] >= 0)) if self.engine else 0,
+                "peak_tracks": self.peak, "left": self.left, "downed": self.downed, "waiting": len(self.queue)}
+
+
+def run_scenario(path, seconds=None, auto_intercept=False, radius=594):
+    # Headless run from time 0 for `seconds` (default: the scenario's duration); the digest changes
+    # if any track's history does, so two runs of one file can be compared
+    scenario = load_scenario(path, digest=True)
+    engine = SimEngine(radius, seed=scenario.seed, aircraft=0, missiles=0, interceptors=0)
+    engine.intercept.enabled = auto_intercept
+    scenario.attach(engine)
+    ticks = int((seconds if seconds is not None else scenario.duration_s or 0) * TICK_RATE)
+    start = time.perf_counter()
+    engine.run(ticks)
+    elapsed = time.perf_counter() - start
+    return {**engine.summary(), **scenario.stats(), "digest": scenario.finish(), "tick_ms": elapsed * 1000 / max(ticks, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a scenario file headlessly and print a JSON summary with a digest of all track histories")
+    parser.add_argument("scenario")
+    parser.add_argument("--seconds", type=float, help="simulated time (default: the scenario's duration_s)")
+    parser.add_argument("--runs", type=int, default=1, help="repeat the run, e.g. to confirm the digest does not change")
+    parser.add_argument("--auto-intercept", action="store_true", help="run the interceptor assignment scheduler")
+    parser.add_argument("--radius", type=int, default=594, help="radar radius in scope units")
+    args = parser.parse_args()
+    for _ in range(args.runs):
+        print(json.dumps(run_scenario(args.scenario, args.seconds, args.auto_intercept, args.radius)))
@@ -1,9 +1,49 @@
 # awacs_sim
 
+import time
+STARTED = time.perf_counter()  # Time to first frame is measured from here
 import pygame
+import json
 import math
+import os
 import random
-import time
+from awacs_assets import AssetCache, SoundBank
+from awacs_engine import SimEngine, Track, TICK, TICK_RATE
+from awacs_feed import FeedService
+from awacs_lod import ScopeLod, density_raster, DENSITY_POINTS
+from awacs_simthread import SimThread, SnapshotBuffer
+from awacs_perf import FrameProfiler
+from awacs_record import Recorder, Replay
+from awacs_scenario import load_scenario
+from awacs_tracks import IFF_STATES, MISSILE, INTERCEPTOR, minmax_decimate
+from awacs_render import TextCache, StaticLayer, RotationCache, NoisePool, RetainedPanel
+
+# Run configuration from the environment; awacs_bench uses it for seeded headless runs
+SCENARIO = load_scenario(os.environ["AWACS_SCENARIO"]) if "AWACS_SCENARIO" in os.environ else None  # Streams tracks instead of a random population
+SEED = int(os.environ["AWACS_SEED"]) if "AWACS_SEED" in os.environ else SCENARIO.seed if SCENARIO else None
+POPULATION = [int(n) for n in os.environ.get("AWACS_POPULATION", "20,5,2").split(",")]  # Aircraft, missiles, interceptors
+FEATURES = set(filter(None, os.environ.get("AWACS_FEATURES", "").split(",")))  # jamming, weather, elint, track, intercept
+MAX_FRAMES = int(os.environ.get("AWACS_FRAMES", 0))  # 0 runs until the window is closed
+FPS_CAP = int(os.environ.get("AWACS_FPS_CAP", 60))  # 0 renders as fast as possible
+LOCKSTEP = os.environ.get("AWACS_LOCKSTEP", "0") == "1"  # One simulation tick per frame instead of real time
+PERF_OUT = os.environ.get("AWACS_PERF_OUT")  # Stage timings are written here as JSON on exit
+RECORD_PATH = os.environ.get("AWACS_RECORD")  # Record the session to this file
+REPLAY_PATH = os.environ.get("AWACS_REPLAY")  # Replay a recorded session instead of simulating
+FEED_ADDRESS = os.environ.get("AWACS_FEED")  # Ingest external track reports, e.g. udp://0.0.0.0:5005 or unix:///tmp/awacs.sock
+SIM_THREAD = os.environ.get("AWACS_SIM_THREAD", "1") == "1"  # Simulate on a thread of its own at the fixed tick rate (0: inline)
+random.seed(SEED)
+
+# Startup stage timings in ms, up to the first frame on screen
+startup = {}
+startup_last = STARTED
+
+def startup_mark(stage):
+    global startup_last
+    now = time.perf_counter()
+    startup[stage] = (now - startup_last) * 1000
+    startup_last = now
+
+startup_mark("imports")
 
 # Initialize Pygame
 pygame.init()
@@ -14,6 +54,7 @@ current_res_index = 0
 WIDTH, HEIGHT = RESOLUTIONS[current_res_index]
 screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
 pygame.display.set_caption("E-3 Sentry AWACS Sim: Next Level")
+startup_mark("display")
 
 # Colors
 BG_DARK = (10, 15, 20)
@@ -28,6 +69,13 @@ ORANGE = (240, 120, 40)
 DARK_GREEN = (40, 80, 40)
 PURPLE = (150, 80, 240)
 MAGENTA = (240, 80, 240)  # For interceptors
+TYPE_COLORS = {"FRIEND": GREEN, "HOSTILE": RED, "UNKNOWN": YELLOW, "CIVILIAN": WHITE, "MISSILE": CYAN, "INTERCEPTOR": MAGENTA}
+
+# Text rendering, cached per (string, font, color) and scaled with the resolution
+text_cache = TextCache()
+
+def render_text(line, size, color):
+    return text_cache.render(line, "consolas", int(size * WIDTH / 1920), color)
 
 # Radar settings
 def update_radar_settings(w, h):
@@ -40,166 +88,289 @@ def update_radar_settings(w, h):
     LOG_HEIGHT = int(h * 0.25)
 
 update_radar_settings(WIDTH, HEIGHT)
-sweep_angle = 0
-sweep_speed = 1.2
 zoom_level = 1.0
-jamming_active = False
-radar_mode = "SEARCH"
-weather_active = False
+jamming_active = "jamming" in FEATURES
+radar_mode = "TRACK" if "track" in FEATURES else "SEARCH"
+weather_active = "weather" in FEATURES
 lock_warning = False
-elint_active = False
+elint_active = "elint" in FEATURES
 flare_active = False
-intercept_active = False
+intercept_active = "intercept" in FEATURES  # Automatic interceptor assignment
 airspace_status = "GREEN"  # GREEN, YELLOW, RED
 
 # Target class with classification and interceptors
-class Target:
-    AIRCRAFT_TYPES = {
-        "FRIEND": ["F-16", "F-22", "C-130"],
-        "HOSTILE": ["MiG-29", "Su-35", "Tu-95"],
-        "UNKNOWN": ["Unknown"],
-        "CIVILIAN": ["Boeing 737", "Airbus A320"],
-        "MISSILE": ["SAM", "Cruise"],
-        "INTERCEPTOR": ["AIM-120"]
-    }
-
-    def __init__(self, is_missile=False, is_interceptor=False):
-        self.angle = random.uniform(0, 360)
-        self.distance = random.randint(150, RADAR_RADIUS) if not is_interceptor else RADAR_RADIUS
-        self.speed = random.uniform(8, 20) if is_missile else random.uniform(20, 30) if is_interceptor else random.uniform(1, 5)
-        self.altitude = random.randint(500, 6000) if is_missile or is_interceptor else random.randint(10000, 45000)
-        self.heading = random.uniform(0, 360)
-        self.type = "INTERCEPTOR" if is_interceptor else "MISSILE" if is_missile else random.choice(["FRIEND", "HOSTILE", "UNKNOWN", "CIVILIAN"])
-        self.model = random.choice(self.AIRCRAFT_TYPES[self.type]) if self.type != "UNKNOWN" else "Unknown"
-        self.color = MAGENTA if is_interceptor else CYAN if is_missile else GREEN if self.type == "FRIEND" else RED if self.type == "HOSTILE" else YELLOW if self.type == "UNKNOWN" else WHITE
-        self.trail = []
-        self.alt_history = []
-        self.last_sweep = -1
-        self.iff_status = "PENDING" if self.type == "UNKNOWN" and not is_missile else self.type
-        self.jammed = False
-        self.locked = False
-        self.flared = False
-        self.target = None  # For interceptors
-        self.radar_cross_section = 0.05 if is_interceptor else random.uniform(0.5, 5.0) if not is_missile else 0.1
-        self.elint_signature = 0 if is_interceptor else random.randint(100, 500) if not is_missile else 50
-        self.threat_level = "LOW" if self.type in ["FRIEND", "CIVILIAN"] else random.choice(["MED", "HIGH"]) if not is_missile else "CRITICAL" if not is_interceptor else "DEFENSE"
-
-    def update(self):
-        if not self.jammed:
-            if self.type == "INTERCEPTOR" and self.target:
-                target_x = RADAR_CENTER[0] + self.target.distance * math.cos(math.radians(self.target.angle))
-                target_y = RADAR_CENTER[1] - self.target.distance * math.sin(math.radians(self.target.angle))
-                self_x = RADAR_CENTER[0] + self.distance * math.cos(math.radians(self.angle))
-                self_y = RADAR_CENTER[1] - self.distance * math.sin(math.radians(self.angle))
-                angle_to_target = math.degrees(math.atan2(target_y - self_y, target_x - self_x))
-                self.heading = angle_to_target
-                if math.hypot(self_x - target_x, self_y - target_y) < 20:
-                    self.target = None  # Interceptor hit
-            self.angle += self.speed * math.cos(math.radians(self.heading - self.angle)) * 0.08
-            self.distance += self.speed * math.sin(math.radians(self.heading - self.angle)) * 0.08
-            self.angle %= 360
-            self.distance = max(100, min(RADAR_RADIUS, self.distance))
-            if self.type == "INTERCEPTOR" and self.distance < 100:
-                self.distance = RADAR_RADIUS  # Respawn interceptor
-            self.altitude += random.randint(-150, 150) if self.type not in ["MISSILE", "INTERCEPTOR"] else 0
-            self.altitude = max(500, min(50000, self.altitude))
-            if random.random() < 0.04:
-                x = RADAR_CENTER[0] + self.distance * math.cos(math.radians(self.angle))
-                y = RADAR_CENTER[1] - self.distance * math.sin(math.radians(self.angle))
-                self.trail.append((x, y))
-                self.alt_history.append(self.altitude)
-                if len(self.trail) > 15:
-                    self.trail.pop(0)
-                if len(self.alt_history) > 50:
-                    self.alt_history.pop(0)
-            if self.flared and random.random() < 0.1:
-                self.jammed = True
-
-    def draw(self, screen, sweep_angle, zoom, mode):
+class Target(Track):
+    def __init__(self, table, rng, radius, is_missile=False, is_interceptor=False):
+        super().__init__(table, rng, radius, is_missile, is_interceptor)
+        self.color = TYPE_COLORS[self.type]
+
+    def draw(self, screen, row, sweep_angle, zoom, mode, detail=True, trail=None):
+        # Drawn from row `row` of the frame, never the live table the sim thread may be stepping;
+        # trail is the (xs, ys) read under its lock, None for no trail
         if mode == "TRACK" and self != selected_target:
             return
-        if abs(self.angle - sweep_angle) < 35 or abs(self.angle - sweep_angle + 360) < 35:
-            self.last_sweep = pygame.time.get_ticks()
-        if pygame.time.get_ticks() - self.last_sweep < 6000:
-            x = RADAR_CENTER[0] + self.distance * math.cos(math.radians(self.angle)) * zoom
-            y = RADAR_CENTER[1] - self.distance * math.sin(math.radians(self.angle)) * zoom
-            if self.jammed and random.random() < 0.8:
-                return
-            if self.type in ["MISSILE", "INTERCEPTOR"]:
-                shape = pygame.Rect(int(x) - 10, int(y) - 10, 20, 20)
-                pygame.draw.rect(screen, self.color, shape, 2)
-            else:
-                points = [
-                    (x + 15 * math.cos(math.radians(self.heading)), y - 15 * math.sin(math.radians(self.heading))),
-                    (x + 10 * math.cos(math.radians(self.heading + 150)), y - 10 * math.sin(math.radians(self.heading + 150))),
-                    (x + 10 * math.cos(math.radians(self.heading - 150)), y - 10 * math.sin(math.radians(self.heading - 150)))
-                ]
-                pygame.draw.polygon(screen, self.color, points, 2)
-            if self.locked:
-                pygame.draw.circle(screen, ORANGE, (int(x), int(y)), 20, 3)
-            if self.flared:
-                pygame.draw.circle(screen, YELLOW, (int(x), int(y)), 25, 2)
-            font = pygame.font.SysFont("consolas", int(16 * WIDTH / 1920))
-            label = font.render(f"{self.iff_status[0]}{id(self)%100}", True, WHITE)
-            screen.blit(label, (int(x) + 25, int(y) - 25))
-            for i, (tx, ty) in enumerate(self.trail):
-                alpha = int(255 * (1 - i / len(self.trail)))
-                pygame.draw.circle(screen, (*self.color[:2], alpha), (int(tx * zoom), int(ty * zoom)), 5)
-            if self == selected_target:
-                for i in range(7):
-                    pred_x = x + i * 15 * self.speed * math.cos(math.radians(self.heading)) * zoom
-                    pred_y = y - i * 15 * self.speed * math.sin(math.radians(self.heading)) * zoom
-                    pygame.draw.circle(screen, (self.color[0], self.color[1], self.color[2], 80), (int(pred_x), int(pred_y)), 4)
-
-# Create targets
-targets = [Target() for _ in range(20)] + [Target(is_missile=True) for _ in range(5)] + [Target(is_interceptor=True) for _ in range(2)]
-
-# Sound
-try:
-    pygame.mixer.init()
-    sample_rate = 44100
-    duration = 0.1
-    samples = int(sample_rate * duration)
-    beep_array = bytearray([int(128 + 127 * math.sin(2 * math.pi * 440 * i / sample_rate)) for i in range(samples)] * 2)
-    warning_array = bytearray([int(128 + 127 * math.sin(2 * math.pi * 880 * i / sample_rate)) for i in range(samples * 3)] * 2)
-    flare_array = bytearray([int(128 + 127 * math.sin(2 * math.pi * 660 * i / sample_rate)) for i in range(samples * 2)] * 2)
-    intercept_array = bytearray([int(128 + 127 * math.sin(2 * math.pi * 1000 * i / sample_rate)) for i in range(samples * 2)] * 2)
-    beep = pygame.mixer.Sound(buffer=beep_array)
-    warning_beep = pygame.mixer.Sound(buffer=warning_array)
-    flare_sound = pygame.mixer.Sound(buffer=flare_array)
-    intercept_sound = pygame.mixer.Sound(buffer=intercept_array)
-except Exception as e:
-    print(f"Audio initialization failed: {e}")
-    beep, warning_beep, flare_sound, intercept_sound = None, None, None, None
+        x = RADAR_CENTER[0] + float(frame.x[row]) * zoom
+        y = RADAR_CENTER[1] - float(frame.y[row]) * zoom
+        if frame.jammed[row] and random.random() < 0.8:
+            return
+        heading = float(frame.heading[row])
+        if frame.type_code[row] in (MISSILE, INTERCEPTOR):
+            shape = pygame.Rect(int(x) - 10, int(y) - 10, 20, 20)
+            pygame.draw.rect(screen, self.color, shape, 2)
+        else:
+            points = [
+                (x + 15 * math.cos(math.radians(heading)), y - 15 * math.sin(math.radians(heading))),
+                (x + 10 * math.cos(math.radians(heading + 150)), y - 10 * math.sin(math.radians(heading + 150))),
+                (x + 10 * math.cos(math.radians(heading - 150)), y - 10 * math.sin(math.radians(heading - 150)))
+            ]
+            pygame.draw.polygon(screen, self.color, points, 2)
+        if frame.locked[row]:
+            pygame.draw.circle(screen, ORANGE, (int(x), int(y)), 20, 3)
+        if frame.flared[row]:
+            pygame.draw.circle(screen, YELLOW, (int(x), int(y)), 25, 2)
+        if not detail:
+            return
+        label = render_text(f"{IFF_STATES[frame.iff_code[row]][0]}{id(self)%100}", 16, WHITE)
+        screen.blit(label, (int(x) + 25, int(y) - 25))
+        if trail is not None:
+            trail_x, trail_y = trail
+            trail = [(int(RADAR_CENTER[0] + tx * zoom), int(RADAR_CENTER[1] - ty * zoom)) for tx, ty in zip(trail_x.tolist(), trail_y.tolist())]
+            trail = [point for i, point in enumerate(trail) if i == 0 or point != trail[i - 1]]  # One dot per pixel
+            for i, point in enumerate(trail):
+                alpha = int(255 * (1 - i / len(trail)))
+                pygame.draw.circle(screen, (*self.color[:2], alpha), point, 5)
+        if self == selected_target:
+            speed = float(frame.speed[row])
+            for i in range(7):
+                pred_x = x + i * 15 * speed * math.cos(math.radians(heading)) * zoom
+                pred_y = y - i * 15 * speed * math.sin(math.radians(heading)) * zoom
+                pygame.draw.circle(screen, (self.color[0], self.color[1], self.color[2], 80), (int(pred_x), int(pred_y)), 4)
+
+def frame_row(view):
+    # Row of `view` in the frame, which may predate a retirement that renumbered it; None if not in it
+    if view is None:
+        return None
+    row = view.row
+    if 0 <= row < len(frame.views) and frame.views[row] is view:
+        return row
+    return next((i for i, other in enumerate(frame.views) if other is view), None)
+
+def locked(read):
+    # Calls read() between ticks when the engine runs on its own thread
+    if not sim_thread:
+        return read()
+    with sim_thread.lock:
+        return read()
+
+# Create targets (a replay spawns them from the recording, a scenario as they arrive)
+if REPLAY_PATH or SCENARIO:
+    POPULATION = [0, 0, 0]
+threaded = SIM_THREAD and not REPLAY_PATH and not LOCKSTEP
+engine = SimEngine(RADAR_RADIUS, seed=SEED, track_class=Target, aircraft=POPULATION[0], missiles=POPULATION[1], interceptors=POPULATION[2])
+targets = engine.targets
+engine.radar_mode = radar_mode
+engine.set_jamming(jamming_active)
+engine.intercept.enabled = intercept_active
+
+# Session recording and after-action replay
+def recolor(target):
+    # Track views created by a replay, feed or scenario are overwritten after construction
+    target.color = TYPE_COLORS[target.type]
+
+if SCENARIO and not REPLAY_PATH:
+    SCENARIO.attach(engine, on_spawn=recolor)
+
+recorder = replay = None
+if RECORD_PATH:
+    recorder = Recorder(RECORD_PATH).attach(engine)
+if REPLAY_PATH:
+    replay = Replay(REPLAY_PATH, engine, on_spawn=recolor)
+    replay.seek(replay.first_tick)
+
+# External track feed, applied once per frame
+feed = None
+if FEED_ADDRESS and not replay:
+    feed = FeedService(FEED_ADDRESS, on_spawn=recolor).start()
+
+# The scope draws from per-tick snapshots; on its own thread the engine keeps its fixed rate however
+# long a frame takes, and the scope interpolates between the last two ticks
+snapshots = SnapshotBuffer(TICK)
+snapshots.reset(engine)
+sim_thread = None
+if threaded:
+    engine.tick_hooks.append(snapshots.capture)
+    sim_thread = SimThread(engine, TICK)
+
+startup_mark("engine")
+
+# Generated assets (tones, backgrounds, noise) are cached on disk by size and seed; backgrounds are
+# cosmetic, so unseeded runs share one set
+assets = AssetCache()
+ASSET_SEED = SEED if SEED is not None else 0
+
+# Sound: the mixer is opened in the background once the first frame is on screen; beeps before then are dropped
+TONE_SAMPLES = int(44100 * 0.1)
+sounds = SoundBank({"beep": (440, TONE_SAMPLES), "warning": (880, TONE_SAMPLES * 3),
+                    "flare": (660, TONE_SAMPLES * 2), "intercept": (1000, TONE_SAMPLES * 2)}, assets)
+
+# Static radar grid, baked once per (resolution, zoom)
+def draw_radar_grid(layer):
+    for r in range(100, int(RADAR_RADIUS * zoom_level) + 1, 100):
+        pygame.draw.circle(layer, DARK_GREEN, RADAR_CENTER, r, 5 if r % 300 == 0 else 2)
+        if r % 300 == 0:
+            text = render_text(f"{r}nm", 14, WHITE)
+            layer.blit(text, (RADAR_CENTER[0] + r * zoom_level + 5, RADAR_CENTER[1] - 20))
+    for angle in range(0, 360, 5):
+        x = RADAR_CENTER[0] + RADAR_RADIUS * zoom_level * math.cos(math.radians(angle))
+        y = RADAR_CENTER[1] - RADAR_RADIUS * zoom_level * math.sin(math.radians(angle))
+        pygame.draw.line(layer, DARK_GREEN, RADAR_CENTER, (x, y), 3 if angle % 30 == 0 else 1)
+        if angle % 30 == 0:
+            text = render_text(f"{angle}°", 14, WHITE)
+            layer.blit(text, (x + 5, y - 5))
+
+grid_layer = StaticLayer(draw_radar_grid)
+rotations = RotationCache(step=1.0, capacity=40)  # Earth map and weather frames
+NOISE_PROFILES = {"normal": (120, 15), "jamming": (250, 30)}  # Dots per 1920x1080 pixels, alpha
 
 # UI elements
-def update_ui_elements():
-    global earth_map, weather, mini_map, radar_noise, altitude_graph, command_log
+def build_earth_map():
+    rng = random.Random(f"earth-{ASSET_SEED}-{RADAR_RADIUS}")
     earth_map = pygame.Surface((RADAR_RADIUS * 2, RADAR_RADIUS * 2), pygame.SRCALPHA)
     for _ in range(60):
         pygame.draw.line(earth_map, DARK_GREEN, 
-                         (random.randint(0, RADAR_RADIUS * 2), random.randint(0, RADAR_RADIUS * 2)),
-                         (random.randint(0, RADAR_RADIUS * 2), random.randint(0, RADAR_RADIUS * 2)), 3)
+                         (rng.randint(0, RADAR_RADIUS * 2), rng.randint(0, RADAR_RADIUS * 2)),
+                         (rng.randint(0, RADAR_RADIUS * 2), rng.randint(0, RADAR_RADIUS * 2)), 3)
+    return earth_map
+
+def build_weather():
+    rng = random.Random(f"weather-{ASSET_SEED}-{RADAR_RADIUS}")
     weather = pygame.Surface((RADAR_RADIUS * 2, RADAR_RADIUS * 2), pygame.SRCALPHA)
     for _ in range(300):
         pygame.draw.circle(weather, (CYAN[0], CYAN[1], CYAN[2], 70), 
-                           (random.randint(0, RADAR_RADIUS * 2), random.randint(0, RADAR_RADIUS * 2)), 
-                           random.randint(40, 80))
-    mini_map = pygame.Surface((MINI_MAP_SIZE, MINI_MAP_SIZE), pygame.SRCALPHA)
-    radar_noise = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-    altitude_graph = pygame.Surface(ALT_GRAPH_SIZE, pygame.SRCALPHA)
-    command_log = pygame.Surface((HUD_WIDTH - 20, LOG_HEIGHT), pygame.SRCALPHA)
+                           (rng.randint(0, RADAR_RADIUS * 2), rng.randint(0, RADAR_RADIUS * 2)), 
+                           rng.randint(40, 80))
+    return weather
 
+def update_ui_elements():
+    # Assets already made for this resolution come from the cache
+    global earth_map, weather, mini_map, radar_noise
+    text_cache.clear()
+    grid_layer.invalidate()
+    rotations.clear()
+    earth_map = assets.surface(("earth", RADAR_RADIUS, ASSET_SEED), build_earth_map)
+    weather = None  # Made on first use
+    mini_map = pygame.Surface((MINI_MAP_SIZE, MINI_MAP_SIZE), pygame.SRCALPHA)
+    radar_noise = NoisePool((0, 0, WIDTH - HUD_WIDTH, HEIGHT - 60), GREEN, NOISE_PROFILES, seed=ASSET_SEED, cache=assets)  # Only the scope area shows noise
+    build_hud_panel()
+
+# HUD widgets, retained between frames and re-rendered only when their bound value changes
+BUTTONS = ["MODE", "IFF", "JAM", "WXR", "LOCK", "ELINT", "FLARE", "INCPT", "RES"]
+
+def render_hud_frame(size):
+    surface = pygame.Surface((HUD_WIDTH, HEIGHT), pygame.SRCALPHA)
+    pygame.draw.rect(surface, FRAME_GRAY, (0, 0, HUD_WIDTH, HEIGHT), border_radius=15)
+    pygame.draw.rect(surface, BG_DARK, (10, 10, HUD_WIDTH - 20, HEIGHT - 20), border_radius=10)
+    return surface
+
+def render_hud_line(line):
+    return render_text(line, 20, GREEN if "GREEN" in line else YELLOW if "YELLOW" in line else RED if "RED" in line else WHITE)
+
+def render_button(state):
+    label, active = state
+    surface = pygame.Surface((200, 50), pygame.SRCALPHA)
+    pygame.draw.rect(surface, ACCENT_BLUE if active else FRAME_GRAY, (0, 0, 200, 50), border_radius=8)
+    surface.blit(render_text(label, 20, WHITE), (40, 10))
+    return surface
+
+def render_target_info(info):
+    surface = pygame.Surface((int(HUD_WIDTH * 0.58), 600), pygame.SRCALPHA)
+    pygame.draw.rect(surface, FRAME_GRAY, surface.get_rect(), border_radius=10)
+    for i, line in enumerate(info):
+        surface.blit(render_text(line, 20, WHITE if i < 12 else PURPLE if i == 13 else ORANGE), (20, 10 + i * 35))
+    return surface
+
+def render_altitude_graph(state):
+    view, _ = state  # Re-rendered whenever the track records a new sample
+    surface = pygame.Surface((ALT_GRAPH_SIZE[0], ALT_GRAPH_SIZE[1] + 20), pygame.SRCALPHA)
+    surface.blit(render_text("ALTITUDE (ft)", 14, WHITE), (0, 0))
+    graph = surface.subsurface((0, 20, ALT_GRAPH_SIZE[0], ALT_GRAPH_SIZE[1]))
+    graph.fill((BG_DARK[0], BG_DARK[1], BG_DARK[2], 220))
+    pygame.draw.rect(graph, FRAME_GRAY, (0, 0, ALT_GRAPH_SIZE[0], ALT_GRAPH_SIZE[1]), 2)
+    xs, altitudes = minmax_decimate(engine.tracks.history.series(view.row, "altitude").astype(float), ALT_GRAPH_SIZE[0])
+    ys = ALT_GRAPH_SIZE[1] - (altitudes / 50000) * (ALT_GRAPH_SIZE[1] - 10)
+    if len(xs) > 1:
+        pygame.draw.lines(graph, ACCENT_BLUE, False, list(zip(xs.tolist(), ys.tolist())), 2)
+    return surface
+
+def render_command_log(entries):
+    if not entries:
+        return None
+    background = pygame.Surface((HUD_WIDTH - 20, LOG_HEIGHT), pygame.SRCALPHA)
+    background.fill((BG_DARK[0], BG_DARK[1], BG_DARK[2], 220))
+    pygame.draw.rect(background, FRAME_GRAY, (0, 0, HUD_WIDTH - 20, LOG_HEIGHT), 2)
+    surface = pygame.Surface((HUD_WIDTH - 20, LOG_HEIGHT + 10), pygame.SRCALPHA)
+    for i, entry in enumerate(entries):
+        surface.blit(background, (0, 0))
+        surface.blit(render_text(entry, 14, WHITE), (10, 10 + i * 20))
+    return surface
+
+def render_status_bar(mode):
+    surface = pygame.Surface((WIDTH, 60))
+    surface.fill(FRAME_GRAY)
+    surface.blit(render_text(f"SYS: ONLINE | DATE: 23 FEB 2025 | POS: 35.7N 139.7E | ALT: 35000ft | MODE: {mode}", 20, ACCENT_BLUE), (20, 15))
+    return surface
+
+def render_lock_warning(active):
+    surface = pygame.Surface((500, 80), pygame.SRCALPHA)
+    pygame.draw.rect(surface, BG_DARK, (0, 0, 500, 80), border_radius=10)
+    pygame.draw.rect(surface, ORANGE, (0, 0, 500, 80), 2, border_radius=10)
+    surface.blit(render_text("WARNING: THREAT LOCK DETECTED", 20, ORANGE), (20, 25))
+    return surface
+
+def build_hud_panel():
+    global hud_panel, full_update
+    hud_panel = RetainedPanel()
+    hud_panel.add("frame", (WIDTH - HUD_WIDTH, 0), render_hud_frame)
+    for i in range(15):
+        hud_panel.add(f"hud{i}", (WIDTH - HUD_WIDTH + 30, 20 + i * 45), render_hud_line)
+    for i in range(len(BUTTONS)):
+        hud_panel.add(f"button{i}", (WIDTH - HUD_WIDTH + 50, 150 + i * 70), render_button)
+    hud_panel.add("info", (WIDTH - int(HUD_WIDTH * 0.6), 150), render_target_info)
+    hud_panel.add("altitude", (WIDTH - int(HUD_WIDTH * 0.6), HEIGHT - ALT_GRAPH_SIZE[1] - LOG_HEIGHT - 70), render_altitude_graph)
+    hud_panel.add("log", (WIDTH - HUD_WIDTH + 10, HEIGHT - LOG_HEIGHT - 20), render_command_log)
+    hud_panel.add("status", (0, HEIGHT - 60), render_status_bar)
+    hud_panel.add("warning", (WIDTH // 2 - 250, 50), render_lock_warning)
+    full_update = True
+
+dirty_rects = os.environ.get("AWACS_DIRTY_RECTS", "0") == "1"  # Partial display updates; toggle with [D]
 update_ui_elements()
+startup_mark("assets")
 log_entries = []
 
+def add_log(message):
+    entry = f"[{time.strftime('%H:%M:%S')}] {message}"
+    log_entries.append(entry)
+    if recorder:
+        recorder.action(engine.ticks, entry)
+
 # Main loop
 running = True
 clock = pygame.time.Clock()
-selected_target = None
-start_time = time.time()
+selected_target = engine.selected = targets[0] if radar_mode == "TRACK" and targets else None
+profiler = FrameProfiler()
+show_perf = False
+lod = ScopeLod()
+if sim_thread:
+    sim_thread.start()
 
 while running:
+    profiler.begin_frame()
+    if MAX_FRAMES and profiler.frames > MAX_FRAMES:
+        break
+    if profiler.frames == MAX_FRAMES // 10 + 1:
+        profiler.reset()  # Drop warm-up frames (cache fills) from scripted runs
+    if sim_thread:
+        sim_thread.lock.acquire()  # Operator actions and feed batches land between ticks
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
             running = False
@@ -207,241 +378,324 @@ while running:
             mx, my = pygame.mouse.get_pos()
             # HUD buttons
             if WIDTH - HUD_WIDTH + 50 <= mx <= WIDTH - HUD_WIDTH + 250:
-                if 150 <= my <= 200:  # Mode
+                if replay and not (340 <= my <= 390 or 460 <= my <= 510 or 640 <= my <= 690):
+                    pass  # Replays are read-only; only the weather, ELINT and resolution buttons apply
+                elif 150 <= my <= 200:  # Mode
                     radar_mode = "TRACK" if radar_mode == "SEARCH" else "SEARCH"
-                    log_entries.append(f"[{time.strftime('%H:%M:%S')}] Mode set to {radar_mode}")
+                    engine.radar_mode = radar_mode
+                    add_log(f"Mode set to {radar_mode}")
                 elif 220 <= my <= 270:  # IFF
                     if selected_target:
-                        old_status = selected_target.iff_status
-                        selected_target.iff_status = random.choice(["FRIEND", "HOSTILE"]) if selected_target.iff_status == "PENDING" else selected_target.iff_status
+                        old_status = engine.identify(selected_target)
                         selected_target.color = GREEN if selected_target.iff_status == "FRIEND" else RED
-                        log_entries.append(f"[{time.strftime('%H:%M:%S')}] IFF: {selected_target.model} changed from {old_status} to {selected_target.iff_status}")
+                        add_log(f"IFF: {selected_target.model} changed from {old_status} to {selected_target.iff_status}")
                 elif 280 <= my <= 330:  # Jam
                     jamming_active = not jamming_active
-                    for target in targets:
-                        target.jammed = jamming_active and random.random() < 0.6
-                    log_entries.append(f"[{time.strftime('%H:%M:%S')}] Jamming {'enabled' if jamming_active else 'disabled'}")
+                    engine.set_jamming(jamming_active)
+                    add_log(f"Jamming {'enabled' if jamming_active else 'disabled'}")
                 elif 340 <= my <= 390:  # Weather
                     weather_active = not weather_active
-                    log_entries.append(f"[{time.strftime('%H:%M:%S')}] Weather radar {'enabled' if weather_active else 'disabled'}")
+                    add_log(f"Weather radar {'enabled' if weather_active else 'disabled'}")
                 elif 400 <= my <= 450:  # Lock
                     if selected_target:
                         selected_target.locked = not selected_target.locked
                         lock_warning = selected_target.locked and selected_target.threat_level in ["HIGH", "CRITICAL"]
-                        log_entries.append(f"[{time.strftime('%H:%M:%S')}] {selected_target.model} {'locked' if selected_target.locked else 'unlocked'}")
+                        add_log(f"{selected_target.model} {'locked' if selected_target.locked else 'unlocked'}")
                 elif 460 <= my <= 510:  # ELINT
                     elint_active = not elint_active
-                    log_entries.append(f"[{time.strftime('%H:%M:%S')}] ELINT {'enabled' if elint_active else 'disabled'}")
+                    add_log(f"ELINT {'enabled' if elint_active else 'disabled'}")
                 elif 520 <= my <= 570:  # Flare
                     flare_active = not flare_active
-                    if flare_active and flare_sound:
-                        flare_sound.play()
-                    for target in targets:
-                        target.flared = flare_active and random.random() < 0.3
-                    log_entries.append(f"[{time.strftime('%H:%M:%S')}] Flares {'deployed' if flare_active else 'disabled'}")
-                elif 580 <= my <= 630:  # Intercept
-                    intercept_active = not intercept_active
-                    if intercept_active and intercept_sound:
-                        intercept_sound.play()
-                    if selected_target and selected_target.threat_level in ["HIGH", "CRITICAL"]:
-                        for t in targets:
-                            if t.type == "INTERCEPTOR" and t.target is None:
-                                t.target = selected_target
-                                log_entries.append(f"[{time.strftime('%H:%M:%S')}] Interceptor launched at {selected_target.model}")
-                                break
+                    if flare_active:
+                        sounds.play("flare")
+                    engine.set_flares(flare_active)
+                    add_log(f"Flares {'deployed' if flare_active else 'disabled'}")
+                elif 580 <= my <= 630:  # Intercept: launch at (or release) the selection, else toggle automatic assignment
+                    if selected_target is None:
+                        intercept_active = not intercept_active
+                        engine.intercept.enabled = intercept_active
+                        if intercept_active:
+                            sounds.play("intercept")
+                        add_log(f"Automatic intercept {'enabled' if intercept_active else 'disabled'}")
+                    elif engine.release_interceptor(selected_target):
+                        add_log(f"{selected_target.model} released to automatic assignment")
+                    elif selected_target.type != "INTERCEPTOR":
+                        interceptor = engine.launch_interceptor(selected_target)
+                        if interceptor:
+                            sounds.play("intercept")
+                        add_log(f"Interceptor launched at {selected_target.model}" if interceptor else f"No interceptor for {selected_target.model}")
+                    else:
+                        add_log(f"{selected_target.model} is under automatic assignment")
                 elif 640 <= my <= 690:  # Resolution
                     current_res_index = (current_res_index + 1) % len(RESOLUTIONS)
                     WIDTH, HEIGHT = RESOLUTIONS[current_res_index]
                     screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE)
                     update_radar_settings(WIDTH, HEIGHT)
+                    engine.resize(RADAR_RADIUS)
                     update_ui_elements()
-                    log_entries.append(f"[{time.strftime('%H:%M:%S')}] Resolution changed to {WIDTH}x{HEIGHT}")
+                    add_log(f"Resolution changed to {WIDTH}x{HEIGHT}")
             # Target selection
-            for target in targets:
-                x = RADAR_CENTER[0] + target.distance * math.cos(math.radians(target.angle)) * zoom_level
-                y = RADAR_CENTER[1] - target.distance * math.sin(math.radians(target.angle)) * zoom_level
-                if math.hypot(mx - x, my - y) < 25:
-                    selected_target = target
-                    log_entries.append(f"[{time.strftime('%H:%M:%S')}] Selected {selected_target.model}")
-                    break
+            target = engine.pick((mx - RADAR_CENTER[0]) / zoom_level, (RADAR_CENTER[1] - my) / zoom_level, 25 / zoom_level)
+            if target:
+                selected_target = engine.selected = target
+                add_log(f"Selected {selected_target.model}")
         elif event.type == pygame.KEYDOWN:
             if event.key == pygame.K_PLUS or event.key == pygame.K_EQUALS:
                 zoom_level = min(5.0, zoom_level + 0.5)
+                grid_layer.invalidate()
             elif event.key == pygame.K_MINUS:
                 zoom_level = max(0.1, zoom_level - 0.5)
+                grid_layer.invalidate()
+            elif event.key == pygame.K_d:
+                dirty_rects = not dirty_rects
+                full_update = True
+                add_log(f"Dirty-rect updates {'enabled' if dirty_rects else 'disabled'}")
+            elif event.key == pygame.K_p:
+                show_perf = not show_perf
+            elif replay:
+                # Replay transport: pause, 1x-64x speed, seek by 10 s, back to the start
+                if event.key == pygame.K_SPACE:
+                    replay.paused = not replay.paused
+                elif event.key in (pygame.K_LEFTBRACKET, pygame.K_RIGHTBRACKET):
+                    replay.faster(1 if event.key == pygame.K_RIGHTBRACKET else -1)
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    replay.seek(replay.tick + (10 if event.key == pygame.K_RIGHT else -10) * TICK_RATE)
+                elif event.key == pygame.K_HOME:
+                    replay.seek(replay.first_tick)
+
+    profiler.mark("events")
+
+    # Advance simulation (or the replay) by the real time elapsed since the last frame
+    if replay:
+        log_entries += replay.advance(TICK if LOCKSTEP else clock.get_time() / 1000)
+        radar_mode = engine.radar_mode
+        if radar_mode == "TRACK":
+            selected_target = engine.selected
+    else:
+        if feed:
+            feed.apply(engine)
+            profiler.mark("feed")
+        if not sim_thread:
+            engine.step(TICK if LOCKSTEP else clock.get_time() / 1000)
+    if selected_target is not None and selected_target.row < 0:
+        add_log(f"{selected_target.model} left the picture")  # Retired by the scenario
+        selected_target = engine.selected = None
+        lock_warning = False
+    if not sim_thread:
+        snapshots.reset(engine)
+    frame = snapshots.frame()
+    sweep_angle = frame.sweep_angle
+    detected_rows = frame.rows
+    selected_row = frame_row(selected_target)
+    profiler.mark("sim")
+
+    # Selected target info and altitude graph, rendered from the live track while the engine is held
+    info = None
+    if selected_target:
+        info = (
+            f"ID: {selected_target.iff_status[0]}{id(selected_target)%100}",
+            f"TYPE: {selected_target.iff_status}",
+            f"MODEL: {selected_target.model}",
+            f"ALT: {selected_target.altitude}ft",
+            f"SPD: {int(selected_target.speed * (600 if selected_target.type in ['MISSILE', 'INTERCEPTOR'] else 200))}kt",
+            f"HDG: {int(selected_target.heading)}°",
+            f"BRG: {int(selected_target.angle)}°",
+            f"RNG: {int(selected_target.distance)}nm",
+            f"DETECT: {int(engine.now - selected_target.last_sweep)//1000}s ago",
+            f"JAMMED: {'YES' if selected_target.jammed else 'NO'}",
+            f"LOCKED: {'YES' if selected_target.locked else 'NO'}",
+            f"FLARED: {'YES' if selected_target.flared else 'NO'}",
+            f"RCS: {selected_target.radar_cross_section:.1f}m²",
+            f"ELINT: {selected_target.elint_signature}MHz",
+            f"THREAT: {selected_target.threat_level}"
+        )
+    hud_panel.bind("info", info)
+    hud_panel.bind("altitude", (selected_target, selected_target.history_written) if selected_target else None)
 
     # Update airspace status
-    hostile_count = sum(1 for t in targets if t.threat_level in ["HIGH", "CRITICAL"] and pygame.time.get_ticks() - t.last_sweep < 6000)
-    airspace_status = "RED" if hostile_count > 3 else "YELLOW" if hostile_count > 0 else "GREEN"
-
-    # Clear screen
-    screen.fill(BG_DARK)
+    airspace_status = engine.airspace_status()
+    if sim_thread:
+        sim_thread.lock.release()
+    profiler.mark("airspace")
+
+    # Clear screen (only the scope in dirty-rect mode; the HUD is retained)
+    scope_rect = pygame.Rect(0, 0, WIDTH - HUD_WIDTH, HEIGHT - 60)
+    if dirty_rects:
+        screen.set_clip(scope_rect)
+        screen.fill(BG_DARK, scope_rect)
+    else:
+        screen.fill(BG_DARK)
 
     # Draw earth map
-    map_rotated = pygame.transform.rotate(earth_map, sweep_angle / 20)
-    map_rect = map_rotated.get_rect(center=RADAR_CENTER)
-    screen.blit(map_rotated, map_rect)
+    rotations.blit(screen, "earth_map", earth_map, sweep_angle / 20, RADAR_CENTER)
 
     # Draw weather
     if weather_active:
-        weather_rotated = pygame.transform.rotate(weather, sweep_angle / 25)
-        weather_rect = weather_rotated.get_rect(center=RADAR_CENTER)
-        screen.blit(weather_rotated, weather_rect)
+        if weather is None:
+            weather = assets.surface(("weather", RADAR_RADIUS, ASSET_SEED), build_weather)
+        rotations.blit(screen, "weather", weather, sweep_angle / 25, RADAR_CENTER)
+
+    profiler.mark("background")
 
     # Draw radar noise
-    radar_noise.fill((0, 0, 0, 0))
-    for _ in range(int(250 * WIDTH / 1920) if jamming_active else int(120 * WIDTH / 1920)):
-        nx, ny = random.randint(0, WIDTH), random.randint(0, HEIGHT)
-        pygame.draw.circle(radar_noise, (GREEN[0], GREEN[1], GREEN[2], 30 if jamming_active else 15), (nx, ny), 3)
-    screen.blit(radar_noise, (0, 0))
+    radar_noise.blit(screen, "jamming" if jamming_active else "normal")
+
+    profiler.mark("noise")
 
     # Draw radar grid
     pygame.draw.rect(screen, FRAME_GRAY, (0, 0, WIDTH, HEIGHT), int(12 * WIDTH / 1920))
-    for r in range(100, int(RADAR_RADIUS * zoom_level) + 1, 100):
-        pygame.draw.circle(screen, DARK_GREEN, RADAR_CENTER, r, 5 if r % 300 == 0 else 2)
-        if r % 300 == 0:
-            text = pygame.font.SysFont("consolas", int(14 * WIDTH / 1920)).render(f"{r}nm", True, WHITE)
-            screen.blit(text, (RADAR_CENTER[0] + r * zoom_level + 5, RADAR_CENTER[1] - 20))
-    for angle in range(0, 360, 5):
-        x = RADAR_CENTER[0] + RADAR_RADIUS * zoom_level * math.cos(math.radians(angle))
-        y = RADAR_CENTER[1] - RADAR_RADIUS * zoom_level * math.sin(math.radians(angle))
-        pygame.draw.line(screen, DARK_GREEN, RADAR_CENTER, (x, y), 3 if angle % 30 == 0 else 1)
-        if angle % 30 == 0:
-            text = pygame.font.SysFont("consolas", int(14 * WIDTH / 1920)).render(f"{angle}°", True, WHITE)
-            screen.blit(text, (x + 5, y - 5))
+    grid_layer.blit(screen, (WIDTH, HEIGHT, zoom_level))
+
+    profiler.mark("grid")
 
     # Draw sweep line
     sweep_end_x = RADAR_CENTER[0] + RADAR_RADIUS * zoom_level * math.cos(math.radians(sweep_angle))
     sweep_end_y = RADAR_CENTER[1] - RADAR_RADIUS * zoom_level * math.sin(math.radians(sweep_angle))
     pygame.draw.line(screen, ACCENT_BLUE, RADAR_CENTER, (sweep_end_x, sweep_end_y), int(8 * WIDTH / 1920))
-    if beep and sweep_angle % 120 < sweep_speed:
-        beep.play()
-    if lock_warning and warning_beep and int(time.time() * 2) % 2 == 0:
-        warning_beep.play()
-    sweep_angle = (sweep_angle + sweep_speed) % 360
-
-    # Update and draw targets
-    for target in targets:
-        target.update()
-        target.draw(screen, sweep_angle, zoom_level, radar_mode)
+    if sweep_angle % 120 < engine.sweep_speed:
+        sounds.play("beep")
+    if lock_warning and int(time.time() * 2) % 2 == 0:
+        sounds.play("warning")
+
+    profiler.mark("sweep")
+
+    # Draw targets: contacts on their own (labels and trails for the top few only) and cluster symbols
+    if radar_mode == "TRACK":
+        scope_rows = detected_rows[detected_rows == selected_row] if selected_row is not None else detected_rows[:0]
+    else:
+        scope_rows = detected_rows
+    lod.plan(frame, scope_rows, zoom_level, RADAR_CENTER, (0, 0, scope_rect.right, scope_rect.bottom), selected_row)
+    detail_views = [(row, frame.views[row]) for row in lod.singles[lod.detail].tolist()]
+    trails = locked(lambda: {row: view.trail for row, view in detail_views if view.row >= 0})
+    for row, detail in zip(lod.singles.tolist(), lod.detail.tolist()):
+        frame.views[row].draw(screen, row, sweep_angle, zoom_level, radar_mode, detail, trails.get(row))
+    for cx, cy, size, lead in zip(*(column.tolist() for column in lod.clusters)):
+        pygame.draw.circle(screen, frame.views[lead].color, (int(cx), int(cy)), int(8 + 3 * math.log2(size)), 2)
+        label = render_text(str(size), 14, WHITE)
+        screen.blit(label, label.get_rect(center=(int(cx), int(cy))))
+    profiler.mark("targets")
 
     # Draw mini-map
     mini_map.fill((BG_DARK[0], BG_DARK[1], BG_DARK[2], 220))
     pygame.draw.circle(mini_map, DARK_GREEN, (MINI_MAP_SIZE // 2, MINI_MAP_SIZE // 2), MINI_MAP_SIZE // 2 - 5, 3)
     for r in range(50, MINI_MAP_SIZE // 2 - 4, 50):
         pygame.draw.circle(mini_map, DARK_GREEN, (MINI_MAP_SIZE // 2, MINI_MAP_SIZE // 2), r, 1)
-    for target in targets:
-        if pygame.time.get_ticks() - target.last_sweep < 6000:
-            mx = MINI_MAP_SIZE // 2 + (target.distance / RADAR_RADIUS) * (MINI_MAP_SIZE // 2 - 5) * math.cos(math.radians(target.angle))
-            my = MINI_MAP_SIZE // 2 - (target.distance / RADAR_RADIUS) * (MINI_MAP_SIZE // 2 - 5) * math.sin(math.radians(target.angle))
-            pygame.draw.circle(mini_map, target.color, (int(mx), int(my)), 5)
+    if len(detected_rows) > DENSITY_POINTS:
+        raster = pygame.surfarray.make_surface(density_raster(frame, detected_rows, RADAR_RADIUS, MINI_MAP_SIZE - 10))
+        mini_map.blit(pygame.transform.scale(raster, (MINI_MAP_SIZE - 10, MINI_MAP_SIZE - 10)), (5, 5), special_flags=pygame.BLEND_RGB_ADD)
+    else:
+        for row in detected_rows.tolist():
+            mx = MINI_MAP_SIZE // 2 + (frame.x[row] / RADAR_RADIUS) * (MINI_MAP_SIZE // 2 - 5)
+            my = MINI_MAP_SIZE // 2 - (frame.y[row] / RADAR_RADIUS) * (MINI_MAP_SIZE // 2 - 5)
+            pygame.draw.circle(mini_map, frame.views[row].color, (int(mx), int(my)), 5)
     mini_rect = mini_map.get_rect(topleft=(WIDTH - HUD_WIDTH - MINI_MAP_SIZE - 20, HEIGHT - MINI_MAP_SIZE - LOG_HEIGHT - 40))
     screen.blit(mini_map, mini_rect)
+    screen.set_clip(None)
+    profiler.mark("minimap")
 
     # Draw HUD
-    pygame.draw.rect(screen, FRAME_GRAY, (WIDTH - HUD_WIDTH, 0, HUD_WIDTH, HEIGHT), border_radius=15)
-    pygame.draw.rect(screen, BG_DARK, (WIDTH - HUD_WIDTH + 10, 10, HUD_WIDTH - 20, HEIGHT - 20), border_radius=10)
-    elapsed_time = int(time.time() - start_time)
+    elapsed_time = int(frame.status["now"] // 1000)
     hud = [
         "E-3 SENTRY AWACS",
         f"ZOOM: {zoom_level:.1f}x",
         f"SWEEP: {int(sweep_angle)}°",
-        f"TARGETS: {len(targets)} (M: {sum(1 for t in targets if t.type == 'MISSILE')})",
+        f"TARGETS: {frame.status['tracks']} (M: {frame.status['missiles']})",
         f"MODE: {radar_mode}",
         f"JAMMING: {'ON' if jamming_active else 'OFF'}",
         f"WEATHER: {'ON' if weather_active else 'OFF'}",
         f"LOCK: {'ACTIVE' if lock_warning else 'OFF'}",
         f"ELINT: {'ON' if elint_active else 'OFF'}",
         f"FLARE: {'ON' if flare_active else 'OFF'}",
-        f"INTERCEPT: {'ON' if intercept_active else 'OFF'}",
+        f"INTERCEPT: {'ON' if intercept_active else 'OFF'}" + (f" ({frame.status['assignment']['assigned']}/{frame.status['assignment']['interceptors']})" if intercept_active else ""),
         f"RES: {WIDTH}x{HEIGHT}",
         f"AIRSPACE: {airspace_status}",
         f"TIME: {elapsed_time//3600:02d}:{(elapsed_time%3600)//60:02d}:{elapsed_time%60:02d}",
-        "CONTROLS: [+/-] ZOOM | CLICK TARGETS & BUTTONS"
+        f"REPLAY {replay.speed}x{' PAUSED' if replay.paused else ''} | [SPACE] [[/]] [<-/->] [HOME]" if replay else "CONTROLS: [+/-] ZOOM | CLICK TARGETS & BUTTONS"
     ]
-    font = pygame.font.SysFont("consolas", int(20 * WIDTH / 1920))
-    small_font = pygame.font.SysFont("consolas", int(14 * WIDTH / 1920))
+    hud_panel.bind("frame", (WIDTH, HEIGHT))
     for i, line in enumerate(hud):
-        text = font.render(line, True, GREEN if "GREEN" in line else YELLOW if "YELLOW" in line else RED if "RED" in line else WHITE)
-        screen.blit(text, (WIDTH - HUD_WIDTH + 30, 20 + i * 45))
+        hud_panel.bind(f"hud{i}", line)
     # Buttons
-    buttons = ["MODE", "IFF", "JAM", "WXR", "LOCK", "ELINT", "FLARE", "INCPT", "RES"]
-    for i, label in enumerate(buttons):
-        color = ACCENT_BLUE if (i == 0 and radar_mode == "TRACK") or (i == 2 and jamming_active) or (i == 3 and weather_active) or (i == 4 and lock_warning) or (i == 5 and elint_active) or (i == 6 and flare_active) or (i == 7 and intercept_active) else FRAME_GRAY
-        pygame.draw.rect(screen, color, (WIDTH - HUD_WIDTH + 50, 150 + i * 70, 200, 50), border_radius=8)
-        text = font.render(label, True, WHITE)
-        screen.blit(text, (WIDTH - HUD_WIDTH + 90, 160 + i * 70))
-
-    # Selected target info
-    if selected_target:
-        info = [
-            f"ID: {selected_target.iff_status[0]}{id(selected_target)%100}",
-            f"TYPE: {selected_target.iff_status}",
-            f"MODEL: {selected_target.model}",
-            f"ALT: {selected_target.altitude}ft",
-            f"SPD: {int(selected_target.speed * (600 if selected_target.type in ['MISSILE', 'INTERCEPTOR'] else 200))}kt",
-            f"HDG: {int(selected_target.heading)}°",
-            f"BRG: {int(selected_target.angle)}°",
-            f"RNG: {int(selected_target.distance)}nm",
-            f"DETECT: {(pygame.time.get_ticks() - selected_target.last_sweep)//1000}s ago",
-            f"JAMMED: {'YES' if selected_target.jammed else 'NO'}",
-            f"LOCKED: {'YES' if selected_target.locked else 'NO'}",
-            f"FLARED: {'YES' if selected_target.flared else 'NO'}",
-            f"RCS: {selected_target.radar_cross_section:.1f}m²",
-            f"ELINT: {selected_target.elint_signature}MHz",
-            f"THREAT: {selected_target.threat_level}"
-        ]
-        pygame.draw.rect(screen, FRAME_GRAY, (WIDTH - int(HUD_WIDTH * 0.6), 150, int(HUD_WIDTH * 0.58), 600), border_radius=10)
-        for i, line in enumerate(info):
-            text = font.render(line, True, WHITE if i < 12 else PURPLE if i == 13 else ORANGE)
-            screen.blit(text, (WIDTH - int(HUD_WIDTH * 0.6) + 20, 160 + i * 35))
-
-    # Altitude graph
-    if selected_target:
-        altitude_graph.fill((BG_DARK[0], BG_DARK[1], BG_DARK[2], 220))
-        pygame.draw.rect(altitude_graph, FRAME_GRAY, (0, 0, ALT_GRAPH_SIZE[0], ALT_GRAPH_SIZE[1]), 2)
-        for i in range(1, len(selected_target.alt_history)):
-            x1 = (i - 1) * ALT_GRAPH_SIZE[0] // 50
-            x2 = i * ALT_GRAPH_SIZE[0] // 50
-            y1 = ALT_GRAPH_SIZE[1] - (selected_target.alt_history[i - 1] / 50000) * (ALT_GRAPH_SIZE[1] - 10)
-            y2 = ALT_GRAPH_SIZE[1] - (selected_target.alt_history[i] / 50000) * (ALT_GRAPH_SIZE[1] - 10)
-            pygame.draw.line(altitude_graph, ACCENT_BLUE, (x1, y1), (x2, y2), 2)
-        text = small_font.render("ALTITUDE (ft)", True, WHITE)
-        screen.blit(altitude_graph, (WIDTH - int(HUD_WIDTH * 0.6), HEIGHT - ALT_GRAPH_SIZE[1] - LOG_HEIGHT - 50))
-        screen.blit(text, (WIDTH - int(HUD_WIDTH * 0.6), HEIGHT - ALT_GRAPH_SIZE[1] - LOG_HEIGHT - 70))
+    active = [radar_mode == "TRACK", False, jamming_active, weather_active, lock_warning, elint_active, flare_active, intercept_active, False]
+    for i, label in enumerate(BUTTONS):
+        hud_panel.bind(f"button{i}", (label, active[i]))
 
     # Command log
-    command_log.fill((BG_DARK[0], BG_DARK[1], BG_DARK[2], 220))
-    pygame.draw.rect(command_log, FRAME_GRAY, (0, 0, HUD_WIDTH - 20, LOG_HEIGHT), 2)
     log_entries = log_entries[-int(LOG_HEIGHT / 20):]  # Limit to visible lines
-    for i, entry in enumerate(log_entries):
-        text = small_font.render(entry, True, WHITE)
-        screen.blit(command_log, (WIDTH - HUD_WIDTH + 10, HEIGHT - LOG_HEIGHT - 20))
-        screen.blit(text, (WIDTH - HUD_WIDTH + 20, HEIGHT - LOG_HEIGHT - 10 + i * 20))
+    hud_panel.bind("log", tuple(log_entries))
 
     # Status bar
-    status = font.render(f"SYS: ONLINE | DATE: 23 FEB 2025 | POS: 35.7N 139.7E | ALT: 35000ft | MODE: {radar_mode}", True, ACCENT_BLUE)
-    pygame.draw.rect(screen, FRAME_GRAY, (0, HEIGHT - 60, WIDTH, 60))
-    screen.blit(status, (20, HEIGHT - 45))
+    hud_panel.bind("status", radar_mode)
 
     # Lock warning
-    if lock_warning:
-        warning = font.render("WARNING: THREAT LOCK DETECTED", True, ORANGE)
-        pygame.draw.rect(screen, (BG_DARK[0], BG_DARK[1], BG_DARK[2], 220), (WIDTH // 2 - 250, 50, 500, 80), border_radius=10)
-        pygame.draw.rect(screen, ORANGE, (WIDTH // 2 - 250, 50, 500, 80), 2, border_radius=10)
-        screen.blit(warning, (WIDTH // 2 - 230, 75))
+    hud_panel.bind("warning", lock_warning or None)
+
+    # Composite HUD widgets over the scope; in dirty-rect mode only changed areas and the scope are pushed
+    if dirty_rects:
+        dirty = hud_panel.compose(screen, [scope_rect])
+    else:
+        hud_panel.compose(screen, [screen.get_rect()])
+    profiler.mark("hud")
 
     # ELINT overlay
+    if dirty_rects:
+        screen.set_clip(scope_rect)
     if elint_active:
-        for target in targets:
-            if pygame.time.get_ticks() - target.last_sweep < 6000:
-                x = RADAR_CENTER[0] + target.distance * math.cos(math.radians(target.angle)) * zoom_level
-                y = RADAR_CENTER[1] - target.distance * math.sin(math.radians(target.angle)) * zoom_level
-                text = small_font.render(f"{target.elint_signature}", True, PURPLE)
-                screen.blit(text, (int(x) + 30, int(y) + 10))
+        for row in lod.singles[lod.detail].tolist():
+            x = RADAR_CENTER[0] + frame.x[row] * zoom_level
+            y = RADAR_CENTER[1] - frame.y[row] * zoom_level
+            text = render_text(f"{frame.elint_signature[row]}", 14, PURPLE)
+            screen.blit(text, (int(x) + 30, int(y) + 10))
+    profiler.mark("elint")
+
+    # Perf overlay: rolling p50/p99 per stage, toggled with [P]
+    if show_perf:
+        assign = locked(engine.intercept.stats)
+        lines = [f"FPS: {clock.get_fps():.0f}   stage p50 p99"] + profiler.report_lines() + [f"{'assign':<10} {assign['p50_ms']:6.2f} {assign['p99_ms']:6.2f} ms"]
+        if sim_thread:
+            sim = locked(sim_thread.stats)
+            lines.append(f"{'tick':<10} {sim['tick_p50_ms']:6.2f} {sim['tick_p99_ms']:6.2f} ms  {sim['ticks_per_s']:.0f}/s")
+        lines.append(f"{'startup':<10} {sum(startup.values()):6.0f} ms to first frame")
+        lines.append(f"{'lod':<10} {lod.last['singles']} contacts + {lod.last['clusters']} clusters of {lod.last['visible']}")
+        if SCENARIO and SCENARIO.engine:
+            flow = locked(SCENARIO.stats)
+            lines.append(f"{'scenario':<10} {flow['active']} active  {flow['spawned']} in  {flow['left'] + flow['downed']} out")
+        if feed:
+            ingest = feed.stats()
+            lines.append(f"{'feed lag':<10} {ingest['latency_p50_ms']:6.2f} {ingest['latency_p99_ms']:6.2f} ms")
+            lines.append(f"{'feed queue':<10} {ingest['depth_p50']:6.0f} {ingest['depth_p99']:6.0f}  dropped {ingest['dropped']}")
+        for i, line in enumerate(lines):
+            screen.blit(render_text(line, 14, CYAN), (30, 30 + i * 18))
+    screen.set_clip(None)
+    profiler.mark("overlay")
 
     # Update display
-    pygame.display.flip()
-    clock.tick(60)
-
+    if dirty_rects and not full_update:
+        pygame.display.update(dirty)
+    else:
+        pygame.display.flip()
+    full_update = False
+    if "first_frame" not in startup:
+        startup_mark("first_frame")
+        sounds.open()
+    profiler.mark("display")
+    clock.tick(FPS_CAP)
+
+if sim_thread:
+    sim_thread.stop()
+if PERF_OUT:
+    with open(PERF_OUT, "w") as f:
+        json.dump({"frames": profiler.frames - 1, "stages": profiler.stats(),
+                   "text_cache": {"hits": text_cache.hits, "misses": text_cache.misses},
+                   "rotation_cache": {"hits": rotations.hits, "misses": rotations.misses},
+                   "intercept": engine.intercept.stats(), "feed": feed.stats() if feed else None,
+                   "lod": lod.last, "sim_thread": sim_thread.stats() if sim_thread else None,
+                   "scenario": SCENARIO.stats() if SCENARIO and SCENARIO.engine else None,
+                   "startup": {"first_frame_ms": sum(startup.values()), "stages": startup, "assets": assets.stats()}}, f)
+if recorder:
+    recorder.close()
+if replay:
+    replay.close()
+if feed:
+    feed.stop()
 pygame.quit()
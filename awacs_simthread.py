@@ -0,0 +1,132 @@
+# A free-running simulation thread for awacs_sim.
+#
+# SimThread steps an engine at its fixed rate on its own thread and SnapshotBuffer hands the render
+# loop consistent per-tick copies to interpolate between.
+#
+# Limits: this is one thread beside the render loop, not multi-core stepping. Both share the GIL and
+# only overlap while numpy or SDL work runs with it released, so the tick rate holds while a tick plus
+# the render loop's Python work fit in the frame budget together. Past that the engine drops time
+# beyond its MAX_CATCH_UP backlog, as it does when stepped inline.
+
+import threading
+import time
+from collections import deque
+import numpy as np
+from awacs_perf import rolling_stats
+from awacs_tracks import MISSILE
+
+SNAPSHOT_COLUMNS = ["x", "y", "distance", "heading", "speed", "type_code", "iff_code", "threat_code",
+                    "jammed", "locked", "flared", "elint_signature"]  # What the scope draws
+
+
+# What the render loop needs of one tick, copied so the simulation can move on while a frame draws:
+# the SNAPSHOT_COLUMNS as attributes (so ScopeLod and density_raster take it in place of the track
+# table), the track view of each row as it was then (retiring tracks renumbers rows) and the figures
+# the HUD shows.
+class Snapshot:
+    def __init__(self, tick, stamp, sweep_angle, rows, columns, views, retired, status):
+        self.tick = tick
+        self.time = stamp
+        self.sweep_angle = sweep_angle
+        self.rows = rows  # Detected rows
+        self.columns = columns
+        for name, values in columns.items():
+            setattr(self, name, values)
+        self.views = views
+        self.retired = retired  # SimEngine.retired; rows keep their tracks while it stays the same
+        self.status = status  # Tracks, missiles, simulation time (ms) and the last interceptor assignment
+
+
+def capture(engine):
+    n = engine.tracks.count
+    tracks = engine.tracks
+    status = {"tracks": n, "missiles": int(engine.picture.counts["type_code"][MISSILE]), "now": engine.now,
+              "assignment": dict(engine.intercept.last)}
+    return Snapshot(engine.ticks, time.perf_counter(), engine.sweep_angle, engine.picture.rows(),
+                    {name: getattr(tracks, name)[:n].copy() for name in SNAPSHOT_COLUMNS}, list(engine.targets), engine.retired, status)
+
+
+def blend(previous, current, alpha):
+    # Positions and sweep `alpha` of the way from previous to current; rows that are new in current, or
+    # hold another track since a retirement renumbered them, stay put
+    x, y = current.x.copy(), current.y.copy()
+    n = min(len(previous.x), len(x))
+    same = slice(0, n)
+    if previous.retired != current.retired:
+        same = np.nonzero(np.fromiter((a is b for a, b in zip(previous.views, current.views)), bool, n))[0]
+    x[same] = previous.x[same] + (x[same] - previous.x[same]) * alpha
+    y[same] = previous.y[same] + (y[same] - previous.y[same]) * alpha
+    sweep = (previous.sweep_angle + (current.sweep_angle - previous.sweep_angle) % 360 * alpha) % 360
+    return Snapshot(current.tick, current.time, sweep, current.rows, {**current.columns, "x": x, "y": y}, current.views, current.retired, current.status)
+
+
+# The last two captured ticks. capture() is a tick hook; frame() renders one tick behind the
+# simulation, interpolated by the wall time elapsed since the newest capture.
+class SnapshotBuffer:
+    def __init__(self, tick):
+        self.tick = tick
+        self.lock = threading.Lock()
+        self.previous = self.current = None
+
+    def capture(self, engine):
+        snapshot = capture(engine)
+        with self.lock:
+            self.previous, self.current = self.current or snapshot, snapshot
+
+    def reset(self, engine):
+        # Show the engine as it is now, without interpolation (inline stepping, replay seeks)
+        snapshot = capture(engine)
+        with self.lock:
+            self.previous = self.current = snapshot
+
+    def frame(self):
+        with self.lock:
+            previous, current = self.previous, self.current
+        if previous.tick == current.tick:
+            return current
+        return blend(previous, current, min((time.perf_counter() - current.time) / self.tick, 1.0))
+
+
+# Steps an engine at its fixed rate on a thread of its own, so a slow frame no longer slows the
+# simulation clock. Anything else touching engine state holds `lock`, which makes it land between ticks.
+class SimThread:
+    def __init__(self, engine, tick, window=300):
+        self.engine = engine
+        self.tick = tick
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+        self.times = deque(maxlen=window)  # ms per tick
+        self.started = 0.0
+        self.first_tick = 0
+
+    def start(self):
+        self.running = True
+        self.started = time.perf_counter()
+        self.first_tick = self.engine.ticks
+        self.thread = threading.Thread(target=self._run, name="awacs-sim", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        last = time.perf_counter()
+        while self.running:
+            with self.lock:
+                start = time.perf_counter()
+                ticks = self.engine.step(start - last)
+                last = start
+                if ticks:
+                    self.times.append((time.perf_counter() - start) * 1000 / ticks)
+            time.sleep(max(0.0, self.tick - (time.perf_counter() - start)))
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def stats(self):
+        times = rolling_stats(self.times)
+        elapsed = time.perf_counter() - self.started
+        return {"ticks_per_s": (self.engine.ticks - self.first_tick) / elapsed if elapsed > 0 else 0.0,
+                "tick_p50_ms": times["p50"], "tick_p99_ms": times["p99"], "tick_max_ms": times["max"]}
@@ -0,0 +1,343 @@
+# Struct-of-arrays track store for awacs_sim
+
+import numpy as np
+
+TYPES = ["FRIEND", "HOSTILE", "UNKNOWN", "CIVILIAN", "MISSILE", "INTERCEPTOR"]
+IFF_STATES = TYPES + ["PENDING"]
+THREAT_LEVELS = ["LOW", "MED", "HIGH", "CRITICAL", "DEFENSE"]
+FRIEND, HOSTILE, UNKNOWN, CIVILIAN, MISSILE, INTERCEPTOR = range(len(TYPES))
+PENDING = IFF_STATES.index("PENDING")
+LOW, MED, HIGH, CRITICAL, DEFENSE = range(len(THREAT_LEVELS))
+
+# Column name -> (dtype, default for new rows); kinematics stay float32 so numpy's SIMD trig kicks in
+COLUMNS = {
+    "angle": (np.float32, 0.0),
+    "distance": (np.float32, 0.0),
+    "speed": (np.float32, 0.0),
+    "heading": (np.float32, 0.0),
+    "x": (np.float32, 0.0),  # Scope-frame position (y up, unzoomed), derived from angle/distance
+    "y": (np.float32, 0.0),
+    "altitude": (np.int32, 0),
+    "type_code": (np.int8, UNKNOWN),
+    "iff_code": (np.int8, PENDING),
+    "threat_code": (np.int8, LOW),
+    "jammed": (np.bool_, False),
+    "locked": (np.bool_, False),
+    "flared": (np.bool_, False),
+    "last_sweep": (np.float64, -1.0),
+    "target_row": (np.int32, -1),  # For interceptors
+    "manual": (np.bool_, False),  # Interceptor launched by the operator; the scheduler leaves it on its target
+    "radar_cross_section": (np.float64, 0.0),
+    "elint_signature": (np.int32, 0),
+    "external": (np.bool_, False),  # Kinematics come from a feed; step() and scatter() leave the row alone
+}
+
+MOVE_SCALE = 0.08  # Scope units (and, along the bearing, degrees) moved per tick per unit of speed
+INNER_LIMIT = 100  # Closest range a track can reach; tracks are clamped between this and the radar radius
+TRAIL_LENGTH = 15
+HISTORY_DEPTH = 1024  # Samples kept per track at most; sampling averages ~2.4/s at 60 ticks/s, so ~7 minutes
+
+
+# Ring buffers of sampled history for every track: one row per track, up to `depth` columns, 6 bytes a
+# sample. Columns are allocated as the history fills, doubling up to `depth`, so short runs and
+# recently spawned tables stay small. written[row] counts samples ever recorded, so the newest sample
+# sits at (written - 1) % allocated.
+class TrackHistory:
+    COLUMNS = {"x": np.int16, "y": np.int16, "altitude": np.uint16}
+    SCALES = {"x": 8, "y": 8}  # Fixed point: positions are kept in 1/8 scope units, within +-4096
+
+    def __init__(self, depth=HISTORY_DEPTH, capacity=64):
+        self.depth = depth
+        self.allocated = min(depth, 64)
+        self.written = np.zeros(capacity, np.int64)
+        for name, dtype in self.COLUMNS.items():
+            setattr(self, name, np.zeros((capacity, self.allocated), dtype))
+
+    def grow(self, capacity):
+        grown = np.zeros(capacity, np.int64)
+        grown[:len(self.written)] = self.written
+        self.written = grown
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros((capacity, self.allocated), column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+
+    def _deepen(self):
+        # Until `allocated` reaches `depth` no row has wrapped, so every sample keeps its slot
+        allocated = min(2 * self.allocated, self.depth)
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros((len(column), allocated), column.dtype)
+            grown[:, :self.allocated] = column
+            setattr(self, name, grown)
+        self.allocated = allocated
+
+    def record(self, rows, **values):
+        # Values are clipped to the column's range (feed tracks are not clamped like simulated ones)
+        if self.allocated < self.depth and len(rows) and self.written[rows].max() >= self.allocated:
+            self._deepen()
+        slots = self.written[rows] % self.allocated
+        for name, value in values.items():
+            column = getattr(self, name)
+            limits = np.iinfo(column.dtype)
+            value = np.rint(np.asarray(value, np.float64) * self.SCALES.get(name, 1))
+            column[rows, slots] = np.clip(value, limits.min, limits.max)
+        self.written[rows] += 1
+
+    def move(self, source, target, count, previous):
+        # Rows `source` are copied onto rows `target`; rows from `count` up to `previous` are freed
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[target] = column[source]
+        self.written[target] = self.written[source]
+        self.written[count:previous] = 0
+
+    def series(self, row, name, last=None):
+        # Samples of one track, oldest first, optionally only the most recent `last`; positions as float32
+        written = int(self.written[row])
+        n = min(written, self.allocated, last or self.depth)
+        samples = getattr(self, name)[row, np.arange(written - n, written) % self.allocated]
+        scale = self.SCALES.get(name)
+        return samples / np.float32(scale) if scale else samples
+
+
+def minmax_decimate(values, width):
+    # Polyline through `values` spread over `width` pixel columns, reduced to a min/max pair per column
+    # once there are more samples than columns; returns (xs, ys)
+    n = len(values)
+    if n <= width:
+        return np.arange(n) * ((width - 1) / max(n - 1, 1)), values
+    edges = np.arange(width) * n // width
+    ys = np.column_stack((np.minimum.reduceat(values, edges), np.maximum.reduceat(values, edges))).ravel()
+    return np.repeat(np.arange(width), 2), ys
+
+
+class TrackTable:
+    def __init__(self, capacity=64, rng=None, history_depth=HISTORY_DEPTH):
+        self.count = 0
+        self.views = []
+        self.history = TrackHistory(history_depth, capacity)
+        self.hits = np.empty(0, np.intp)  # Interceptor rows that reached their target on the last step
+        self.downed = np.empty(0, np.intp)  # The targets of those hits
+        self.rng = rng if rng is not None else np.random.default_rng()
+        for name, (dtype, _) in COLUMNS.items():
+            setattr(self, name, np.zeros(capacity, dtype))
+
+    def __len__(self):
+        return self.count
+
+    def add(self, view, **values):
+        if self.count == len(self.angle):
+            self._grow(max(64, 2 * self.count))
+        row = self.count
+        for name, (_, default) in COLUMNS.items():
+            getattr(self, name)[row] = values.get(name, default)
+        self.count += 1
+        self.views.append(view)
+        self.locate(slice(row, row + 1))
+        return row
+
+    def extend(self, views, **values):
+        # One row per view, appended in one batch; values are arrays (or scalars) per column, missing
+        # columns take their defaults. Returns the new rows.
+        n = len(views)
+        if self.count + n > len(self.angle):
+            self._grow(max(64, 2 * (self.count + n)))
+        rows = slice(self.count, self.count + n)
+        for name, (_, default) in COLUMNS.items():
+            getattr(self, name)[rows] = values.get(name, default)
+        for row, view in enumerate(views, self.count):
+            view.table, view.row = self, row
+        self.count += n
+        self.views += views
+        self.locate(rows)
+        return np.arange(rows.start, rows.stop)
+
+    def snapshot(self):
+        # Copies of every column for the live rows
+        return {name: getattr(self, name)[:self.count].copy() for name in COLUMNS}
+
+    def load(self, columns):
+        # Overwrite the table from a snapshot; keeping `views` in step is up to the caller
+        count = len(columns["angle"])
+        if count > len(self.angle):
+            self._grow(count)
+        for name, values in columns.items():
+            getattr(self, name)[:count] = values
+        self.count = count
+
+    def compact(self, keep):
+        # Drop the rows where `keep` is false. Kept rows past the new end fill the holes, so only as many
+        # rows move as are dropped; their views are renumbered, dropped views get row -1 and target rows
+        # pointing at dropped tracks are cleared, with their manual flag. Returns the new row of every old
+        # row (-1 if dropped).
+        n = self.count
+        keep = keep[:n]
+        m = int(np.count_nonzero(keep))
+        holes = np.nonzero(~keep[:m])[0]
+        movers = np.nonzero(keep[m:])[0] + m
+        renumber = np.arange(n + 1, dtype=np.int32)
+        renumber[np.nonzero(~keep)[0]] = -1
+        renumber[movers] = holes
+        renumber[n] = -1  # Target row -1 stays -1
+        for name in COLUMNS:
+            column = getattr(self, name)
+            column[holes] = column[movers]
+        target_row = self.target_row[:m]
+        target_row[:] = renumber[target_row]
+        self.manual[:m] &= target_row >= 0  # A manual intercept ends with its target
+        self.history.move(movers, holes, m, n)
+        views = self.views
+        for row in np.nonzero(~keep)[0].tolist():
+            views[row].row = -1
+        for hole, mover in zip(holes.tolist(), movers.tolist()):
+            views[hole] = views[mover]
+            views[hole].row = hole
+        del views[m:]
+        self.count = m
+        return renumber[:n]
+
+    def _grow(self, capacity):
+        for name in COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, column.dtype)
+            grown[:len(column)] = column
+            setattr(self, name, grown)
+        self.history.grow(capacity)
+
+    def step(self, radius):
+        # One kinematics tick for every track; returns rows that sampled trail/altitude history
+        n = self.count
+        rng = self.rng
+        internal = ~self.external[:n]
+        active = ~self.jammed[:n] & internal
+        angle, distance, heading = self.angle[:n], self.distance[:n], self.heading[:n]
+        type_code, target_row = self.type_code[:n], self.target_row[:n]
+
+        # Interceptor homing, in the screen frame used by the scope
+        homing = np.nonzero(active & (type_code == INTERCEPTOR) & (target_row >= 0))[0]
+        self.hits = self.downed = homing[:0]
+        if len(homing):
+            tgt = target_row[homing]
+            dx = self.x[tgt] - self.x[homing]
+            dy = self.y[homing] - self.y[tgt]
+            heading[homing] = np.degrees(np.arctan2(dy, dx))
+            hit = np.hypot(dx, dy) < 20
+            self.hits, self.downed = homing[hit], tgt[hit]
+            target_row[self.hits] = -1  # Interceptor hit
+            self.manual[self.hits] = False
+
+        move = self.speed[:n] * MOVE_SCALE * active
+        angle += move * np.cos(np.radians(heading - angle))
+        distance += move * np.sin(np.radians(heading - angle))
+        angle[angle >= 360] -= 360
+        angle[angle < 0] += 360
+        np.clip(distance, INNER_LIMIT, radius, out=distance, where=internal)
+
+        climbing = active & (type_code != MISSILE) & (type_code != INTERCEPTOR)
+        altitude = self.altitude[:n]
+        altitude += rng.integers(-150, 151, n, dtype=np.int32) * climbing
+        np.clip(altitude, 500, 50000, out=altitude, where=internal)
+
+        sampled = np.nonzero(~self.jammed[:n] & (rng.random(n) < 0.04))[0]  # Feed tracks keep a trail too
+        self.jammed[:n] |= active & self.flared[:n] & (rng.random(n) < 0.1)
+        rad = np.radians(angle)
+        np.multiply(distance, np.cos(rad), out=self.x[:n], where=internal)
+        np.multiply(distance, np.sin(rad), out=self.y[:n], where=internal)
+        self.history.record(sampled, x=self.x[sampled], y=self.y[sampled], altitude=self.altitude[sampled])
+        return sampled
+
+    def velocity(self, rows):
+        # Scope-frame displacement per tick implied by the kinematics in step(), as (vx, vy)
+        angle = np.radians(self.angle[rows])
+        relative = np.radians(self.heading[rows] - self.angle[rows])
+        move = self.speed[rows] * MOVE_SCALE * ~self.jammed[rows]
+        radial = move * np.sin(relative)
+        tangential = self.distance[rows] * np.radians(move * np.cos(relative))  # The bearing moves in degrees
+        return (radial * np.cos(angle) - tangential * np.sin(angle), radial * np.sin(angle) + tangential * np.cos(angle))
+
+    def locate(self, rows):
+        # Refresh the cartesian columns after angle/distance changed
+        rad = np.radians(self.angle[rows])
+        self.x[rows] = self.distance[rows] * np.cos(rad)
+        self.y[rows] = self.distance[rows] * np.sin(rad)
+
+    def scatter(self, name, probability, enabled=True):
+        # Vectorized per-track coin flip, e.g. jamming or flares across the whole picture; feed tracks keep theirs
+        n = self.count
+        np.copyto(getattr(self, name)[:n], enabled & (self.rng.random(n) < probability), where=~self.external[:n])
+
+
+def _column(name, cast):
+    def get(self):
+        return cast(getattr(self.table, name)[self.row])
+
+    def set(self, value):
+        getattr(self.table, name)[self.row] = value
+    return property(get, set)
+
+
+def _coded(name, names):
+    def get(self):
+        return names[getattr(self.table, name)[self.row]]
+
+    def set(self, value):
+        getattr(self.table, name)[self.row] = names.index(value)
+    return property(get, set)
+
+
+# Thin per-track view onto a TrackTable row; non-numeric details live on the view
+class TrackView:
+    angle = _column("angle", float)
+    distance = _column("distance", float)
+    speed = _column("speed", float)
+    heading = _column("heading", float)
+    x = _column("x", float)
+    y = _column("y", float)
+    altitude = _column("altitude", int)
+    jammed = _column("jammed", bool)
+    locked = _column("locked", bool)
+    flared = _column("flared", bool)
+    manual = _column("manual", bool)
+    last_sweep = _column("last_sweep", int)
+    radar_cross_section = _column("radar_cross_section", float)
+    elint_signature = _column("elint_signature", int)
+    type = _coded("type_code", TYPES)
+    iff_status = _coded("iff_code", IFF_STATES)
+    threat_level = _coded("threat_code", THREAT_LEVELS)
+
+    def __init__(self, table, **values):
+        self.table = table
+        self.row = table.add(self, **values)
+
+    @classmethod
+    def batch(cls, table, count, **values):
+        # `count` views over rows appended with TrackTable.extend; __init__ is not run, so subclasses
+        # get none of its per-track setup
+        views = [cls.__new__(cls) for _ in range(count)]
+        table.extend(views, **values)
+        return views
+
+    @property
+    def trail(self):
+        # Most recent sampled positions in the scope frame, oldest first, as (xs, ys)
+        history = self.table.history
+        return history.series(self.row, "x", TRAIL_LENGTH), history.series(self.row, "y", TRAIL_LENGTH)
+
+    @property
+    def alt_history(self):
+        return self.table.history.series(self.row, "altitude")
+
+    @property
+    def history_written(self):
+        return int(self.table.history.written[self.row])
+
+    @property
+    def target(self):
+        row = self.table.target_row[self.row]
+        return self.table.views[row] if row >= 0 else None
+
+    @target.setter
+    def target(self, view):
+        self.table.target_row[self.row] = view.row if view is not None else -1